@@ -1,72 +1,86 @@
-from flask import Flask
+from flask import Flask, current_app
 from flask_mail import Mail
 from flask_caching import Cache
 from dotenv import load_dotenv
 import os
 from flask_cors import CORS
+from werkzeug.local import LocalProxy
+from models.engine import database_uri, engine_options, install_sqlite_pragmas
 
 load_dotenv()
 
-app = Flask(__name__)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hospital.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
-app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', '').replace(" ", "")
-app.config['MAIL_DEFAULT_SENDER'] = ('Hospital', app.config['MAIL_USERNAME'])
-
-app.config['CELERY_BROKER_URL'] = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
-app.config['CELERY_RESULT_BACKEND'] = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
-app.config['CELERY_INCLUDE'] = ['tasks.celery_tasks']
-
-app.config['CACHE_TYPE'] = 'RedisCache'
-app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/1')
-app.config['CACHE_DEFAULT_TIMEOUT'] = 300
-
-CORS(app, supports_credentials=True, origins=['http://localhost:3000'])
-
-mail = Mail(app)
-cache = Cache(app)
-
-from models.database import db, Patient, Department
-db.init_app(app)
-
-from tasks.celery_tasks import make_celery
-celery = make_celery(app)
-
-from routes.routes import routes
-app.register_blueprint(routes)
-
-with app.app_context():
-    db.create_all()
-    admin = Patient.query.filter_by(username='admin').first()
-    if not admin:
-        admin = Patient(
-            username='admin',
-            is_admin=True,
-            full_name='System Administrator',
-            email=os.getenv('ADMIN_EMAIL', 'admin@hospital.com')
-        )
-        admin.set_password(os.getenv('ADMIN_PASSWORD', 'admin'))
-        db.session.add(admin)
-        db.session.commit()
-    
-    if Department.query.count() == 0:
-        departments = [
-            Department(name='Cardiology', description='Heart and cardiovascular system care'),
-            Department(name='Neurology', description='Brain and nervous system treatment'),
-            Department(name='Orthopedics', description='Bone, joint, and muscle care'),
-            Department(name='Pediatrics', description='Medical care for children'),
-            Department(name='Dermatology', description='Skin, hair, and nail treatment'),
-            Department(name='General Medicine', description='Primary and general healthcare'),
-        ]
-        db.session.add_all(departments)
-        db.session.commit()
+mail = Mail()
+cache = Cache()
+
+def get_celery(app):
+    if 'celery' not in app.extensions:
+        from tasks.celery_tasks import make_celery
+        app.extensions['celery'] = make_celery(app)
+    return app.extensions['celery']
+
+celery = LocalProxy(lambda: get_celery(current_app))
+
+def create_app(config=None):
+    app = Flask(__name__)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
+
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = os.getenv('MAIL_USERNAME')
+    app.config['MAIL_PASSWORD'] = os.getenv('MAIL_PASSWORD', '').replace(" ", "")
+    app.config['MAIL_DEFAULT_SENDER'] = ('Hospital', app.config['MAIL_USERNAME'])
+
+    app.config['CELERY_BROKER_URL'] = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+    app.config['CELERY_RESULT_BACKEND'] = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
+    app.config['CELERY_INCLUDE'] = ['tasks.celery_tasks']
+
+    app.config['CACHE_TYPE'] = 'RedisCache'
+    app.config['CACHE_REDIS_URL'] = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/1')
+    app.config['CACHE_DEFAULT_TIMEOUT'] = 300
+
+    app.config['EXPORT_DIR'] = os.getenv('EXPORT_DIR', os.path.join(app.instance_path, 'exports'))
+    app.config['PUBLIC_BASE_URL'] = os.getenv('PUBLIC_BASE_URL', 'http://localhost:5000')
+
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+
+    CORS(app, supports_credentials=True, origins=['http://localhost:3000'])
+
+    mail.init_app(app)
+    cache.init_app(app)
+
+    from models.database import db
+    db.init_app(app)
+    with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            install_sqlite_pragmas(db.engine)
+
+    from routes.routes import routes
+    app.register_blueprint(routes)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        from models.seed import init_db
+        init_db()
+        print('Database tables created and seed data loaded')
+
+    @app.cli.command('rebuild-search-index')
+    def rebuild_search_index_command():
+        from models.search import ensure_search_index, rebuild_search_index
+        if not ensure_search_index():
+            print('Full-text search index needs SQLite, searches fall back to LIKE queries')
+            return
+        rebuild_search_index()
+        print('Search index rebuilt')
+
+    return app
+
+app = create_app()
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,96 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import percentile, use_local_cache
+
+def setup(patients, slots):
+    from models.database import db, Patient, Doctor, DoctorAvailability
+    from models.slots import SLOT_MINUTES, from_minutes
+    from werkzeug.security import generate_password_hash
+    app = use_local_cache()
+    day = date.today() + timedelta(days=1)
+    with app.app_context():
+        password_hash = generate_password_hash('bench')
+        doctor = Doctor(name='Bench', username='bench_doctor', department_id=1, password_hash=password_hash)
+        db.session.add(doctor)
+        db.session.flush()
+        db.session.add(DoctorAvailability(
+            doctor_id=doctor.id, date=day, start_time=from_minutes(9 * 60),
+            end_time=from_minutes(9 * 60 + slots * SLOT_MINUTES), is_enabled=True
+        ))
+        db.session.execute(db.insert(Patient), [
+            {'username': f'bench_{i}', 'password_hash': password_hash, 'full_name': f'Bench {i}'} for i in range(patients)
+        ])
+        db.session.commit()
+        patient_ids = [row[0] for row in db.session.query(Patient.id).filter(Patient.username.like('bench_%'))]
+        return app, doctor.id, day, patient_ids
+
+def burst(app, doctor_id, day, patient_ids, slots, requests_count, concurrency):
+    from models.slots import SLOT_MINUTES, format_minutes
+
+    def book(i):
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s['user_id'] = patient_ids[i % len(patient_ids)]
+        payload = {'doctor_id': doctor_id, 'date': day.isoformat(), 'time': format_minutes(9 * 60 + (i % slots) * SLOT_MINUTES)}
+        start = time.perf_counter()
+        response = client.post('/appointment', json=payload)
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(book, range(requests_count)))
+    elapsed = time.perf_counter() - start
+    latencies = [ms for _, ms in results]
+    return {
+        'requests': requests_count,
+        'booked': sum(1 for code, _ in results if code == 201),
+        'conflicts': sum(1 for code, _ in results if code == 409),
+        'errors': sum(1 for code, _ in results if code not in (201, 409)),
+        'requests_per_sec': round(requests_count / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+def double_bookings(app, doctor_id):
+    from models.database import db, Appointment
+    from models.slots import ACTIVE_STATUSES
+    from sqlalchemy import func
+    with app.app_context():
+        return db.session.query(Appointment.date, Appointment.time).filter(
+            Appointment.doctor_id == doctor_id, Appointment.status.in_(ACTIVE_STATUSES)
+        ).group_by(Appointment.date, Appointment.time).having(func.count() > 1).count()
+
+def cancel_all(app, doctor_id):
+    from models.database import db, Appointment
+    with app.app_context():
+        Appointment.query.filter_by(doctor_id=doctor_id).update(
+            {'status': 'cancelled', 'updated_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent booking burst against a handful of released slots')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--slots', type=int, default=8)
+    parser.add_argument('--patients', type=int, default=500)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app, doctor_id, day, patient_ids = setup(args.patients, args.slots)
+        first = burst(app, doctor_id, day, patient_ids, args.slots, args.requests, args.concurrency)
+        first['double_bookings'] = double_bookings(app, doctor_id)
+        cancel_all(app, doctor_id)
+        rebook = burst(app, doctor_id, day, patient_ids, args.slots, args.requests, args.concurrency)
+        rebook['double_bookings'] = double_bookings(app, doctor_id)
+        print(json.dumps({'slots': args.slots, 'concurrency': args.concurrency, 'release': first, 'after_cancel': rebook}, indent=2))
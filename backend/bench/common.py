@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0
+
+def latency_summary(latencies_ms, elapsed):
+    return {
+        'requests_per_sec': round(len(latencies_ms) / elapsed, 1) if elapsed else 0,
+        'p50_ms': round(percentile(latencies_ms, 50), 2),
+        'p95_ms': round(percentile(latencies_ms, 95), 2),
+        'p99_ms': round(percentile(latencies_ms, 99), 2),
+    }
+
+def run_concurrently(fn, count, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(fn, range(count)))
+    return results, time.perf_counter() - start
+
+def use_local_cache():
+    from app import app, cache
+    from models.seed import init_db
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    with app.app_context():
+        init_db()
+    return app
@@ -0,0 +1,81 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from models.engine import install_sqlite_pragmas, sqlite_pragmas
+
+def make_engine(path, tuned):
+    if tuned:
+        pragmas = sqlite_pragmas()
+        engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': pragmas['busy_timeout'] / 1000})
+        install_sqlite_pragmas(engine, pragmas)
+    else:
+        engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS appointment (id INTEGER PRIMARY KEY, doctor_id INTEGER, date TEXT, time TEXT, status TEXT)'))
+        conn.execute(text('CREATE INDEX IF NOT EXISTS idx_doctor_date ON appointment (doctor_id, date)'))
+    return engine
+
+def run(tuned, readers, writers, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, 'bench.db'), tuned)
+        counts = {'reads': 0, 'writes': 0, 'locked': 0}
+        lock = threading.Lock()
+        stop = time.monotonic() + seconds
+
+        def writer(worker_id):
+            i = 0
+            while time.monotonic() < stop:
+                try:
+                    with engine.begin() as conn:
+                        conn.execute(text('INSERT INTO appointment (doctor_id, date, time, status) VALUES (:d, :date, :t, :s)'),
+                                     {'d': worker_id, 'date': '2026-01-01', 't': f'{i:06d}', 's': 'booked'})
+                    key = 'writes'
+                except OperationalError:
+                    key = 'locked'
+                with lock:
+                    counts[key] += 1
+                i += 1
+
+        def reader(worker_id):
+            while time.monotonic() < stop:
+                try:
+                    with engine.connect() as conn:
+                        conn.execute(text('SELECT count(*) FROM appointment WHERE doctor_id = :d AND date = :date'),
+                                     {'d': worker_id % max(writers, 1), 'date': '2026-01-01'}).scalar()
+                    key = 'reads'
+                except OperationalError:
+                    key = 'locked'
+                with lock:
+                    counts[key] += 1
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        engine.dispose()
+    return {
+        'profile': 'tuned' if tuned else 'default',
+        'reads_per_sec': round(counts['reads'] / seconds, 1),
+        'writes_per_sec': round(counts['writes'] / seconds, 1),
+        'locked_errors': counts['locked'],
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent SQLite read/write throughput, default vs tuned profile')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+    results = [run(tuned, args.readers, args.writers, args.seconds) for tuned in (False, True)]
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Ananya', 'Diya', 'Ishaan', 'Kavya', 'Meera', 'Rohan', 'Saanvi', 'Arjun', 'Priya', 'Kabir', 'Nisha', 'Vikram', 'Zara']
+LAST_NAMES = ['Sharma', 'Verma', 'Iyer', 'Patel', 'Reddy', 'Nair', 'Gupta', 'Kulkarni', 'Mehta', 'Singh', 'Das', 'Joshi']
+DIAGNOSES = ['Hypertension', 'Type 2 diabetes', 'Migraine', 'Seasonal allergy', 'Lower back pain', 'Viral fever', 'Asthma', 'Eczema', 'Arrhythmia', 'Gastritis', 'Sprained ankle', 'Anxiety disorder']
+PRESCRIPTIONS = ['Paracetamol 500mg', 'Amlodipine 5mg', 'Metformin 500mg', 'Cetirizine 10mg', 'Ibuprofen 400mg', 'Salbutamol inhaler', 'Omeprazole 20mg', 'Physiotherapy twice weekly']
+REASONS = ['Routine checkup', 'Follow-up visit', 'Persistent pain', 'Fever and cough', 'Medication review', 'Skin rash', None]
+DAY_START = 9 * 60
+DAY_SLOTS = 16
+BATCH_SIZE = 20000
+
+def chunks(rows, size=BATCH_SIZE):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+def memoized(process):
+    cache = {}
+    def convert(value):
+        if value not in cache:
+            cache[value] = process(value)
+        return cache[value]
+    return convert
+
+def bulk_insert(conn, table, rows):
+    columns = list(rows[0]) if rows else []
+    converters = [(i, memoized(process)) for i, name in enumerate(columns)
+                  if (process := table.c[name].type.dialect_impl(conn.dialect).bind_processor(conn.dialect))]
+    placeholder = '?' if conn.dialect.paramstyle == 'qmark' else '%s'
+    preparer = conn.dialect.identifier_preparer
+    sql = (f"INSERT INTO {preparer.format_table(table)} ({', '.join(preparer.quote(c) for c in columns)}) "
+           f"VALUES ({', '.join([placeholder] * len(columns))})")
+    for chunk in chunks(rows):
+        params = []
+        for row in chunk:
+            values = list(row.values())
+            for i, convert in converters:
+                values[i] = convert(values[i])
+            params.append(tuple(values))
+        conn.exec_driver_sql(sql, params)
+    return len(rows)
+
+def next_id(conn, table):
+    from sqlalchemy import func, select
+    return (conn.execute(select(func.max(table.c.id))).scalar() or 0) + 1
+
+def generate(patients, doctors, days_back, days_ahead, per_day, cancel_rate, seed):
+    from app import app
+    from models.database import db, Patient, Doctor, Department, Appointment, Treatment, DoctorAvailability
+    from models.passwords import hash_password
+    from models.queries import refresh_dashboard_counters
+    from models.seed import init_db
+    from models.search import drop_search_triggers, ensure_search_index, rebuild_search_index
+    from models.slots import from_minutes, SLOT_MINUTES
+
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    password_hash = hash_password('password')
+    counts = {}
+    with app.app_context():
+        init_db()
+        drop_search_triggers()
+        conn = db.session.connection()
+        department_ids = [row[0] for row in conn.execute(db.select(Department.id))]
+        patient_start = next_id(conn, Patient.__table__)
+        doctor_start = next_id(conn, Doctor.__table__)
+        appointment_id = next_id(conn, Appointment.__table__)
+
+        def name():
+            return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+        counts['patients'] = bulk_insert(conn, Patient.__table__, [{
+            'id': patient_start + i, 'username': f'patient{patient_start + i}', 'password_hash': password_hash,
+            'is_admin': False, 'full_name': name(), 'email': f'patient{patient_start + i}@example.com',
+            'phone': f'9{rng.randrange(10 ** 9):09d}', 'age': rng.randint(1, 90), 'gender': rng.choice(['Male', 'Female']),
+            'created_at': now,
+        } for i in range(patients)])
+        counts['doctors'] = bulk_insert(conn, Doctor.__table__, [{
+            'id': doctor_start + i, 'name': name(), 'username': f'doctor{doctor_start + i}', 'password_hash': password_hash,
+            'email': f'doctor{doctor_start + i}@example.com', 'phone': f'8{rng.randrange(10 ** 9):09d}',
+            'qualification': 'MBBS, MD', 'experience_years': rng.randint(1, 35),
+            'department_id': rng.choice(department_ids), 'created_at': now,
+        } for i in range(doctors)])
+
+        days = [today + timedelta(days=offset) for offset in range(-days_back, days_ahead + 1)]
+        counts['availability'] = bulk_insert(conn, DoctorAvailability.__table__, [{
+            'doctor_id': doctor_id, 'date': day, 'start_time': from_minutes(DAY_START),
+            'end_time': from_minutes(DAY_START + DAY_SLOTS * SLOT_MINUTES), 'is_enabled': True,
+            'created_at': now, 'updated_at': now,
+        } for doctor_id in range(doctor_start, doctor_start + doctors) for day in days])
+
+        appointments, treatments = [], []
+        for doctor_id in range(doctor_start, doctor_start + doctors):
+            for day in days:
+                for slot in rng.sample(range(DAY_SLOTS), min(per_day, DAY_SLOTS)):
+                    past = day < today
+                    status = 'cancelled' if rng.random() < cancel_rate else ('completed' if past else 'booked')
+                    appointments.append({
+                        'id': appointment_id, 'patient_id': patient_start + rng.randrange(patients), 'doctor_id': doctor_id,
+                        'date': day, 'time': from_minutes(DAY_START + slot * SLOT_MINUTES), 'status': status,
+                        'reason': rng.choice(REASONS), 'created_at': now, 'updated_at': now,
+                    })
+                    if status == 'completed':
+                        treatments.append({
+                            'appointment_id': appointment_id, 'diagnosis': rng.choice(DIAGNOSES),
+                            'prescription': rng.choice(PRESCRIPTIONS), 'notes': None,
+                            'follow_up_date': day + timedelta(days=rng.choice([14, 30, 90])) if rng.random() < 0.3 else None,
+                            'created_at': now, 'updated_at': now,
+                        })
+                    appointment_id += 1
+        counts['appointments'] = bulk_insert(conn, Appointment.__table__, appointments)
+        counts['treatments'] = bulk_insert(conn, Treatment.__table__, treatments)
+        db.session.commit()
+        ensure_search_index()
+        rebuild_search_index()
+        refresh_dashboard_counters()
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bulk-load synthetic patients, doctors, calendars and appointment history')
+    parser.add_argument('--patients', type=int, default=20000)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--days-back', type=int, default=730)
+    parser.add_argument('--days-ahead', type=int, default=30)
+    parser.add_argument('--per-day', type=int, default=6, help='appointments per doctor per day')
+    parser.add_argument('--cancel-rate', type=float, default=0.1)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    counts = generate(args.patients, args.doctors, args.days_back, args.days_ahead, args.per_day, args.cancel_rate, args.seed)
+    counts['seconds'] = round(time.perf_counter() - start, 1)
+    print(json.dumps(counts, indent=2))
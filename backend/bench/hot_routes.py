@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import sys
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import latency_summary, run_concurrently
+from bench.generate_data import FIRST_NAMES, DIAGNOSES
+
+EXPECTED = {
+    'login': (200,),
+    'available_slots': (200,),
+    'book': (201, 409),
+    'patient_dashboard': (200,),
+    'doctor_dashboard': (200,),
+    'admin_dashboard': (200,),
+    'patient_history': (200,),
+    'admin_search': (200,),
+}
+
+def sample_ids(app, seed):
+    from models.database import db, Patient, Doctor
+    from sqlalchemy import func
+    with app.app_context():
+        rng = random.Random(seed)
+        patients = [row[0] for row in db.session.query(Patient.id).filter(Patient.is_admin == False).order_by(func.random()).limit(500)]
+        doctors = [row[0] for row in db.session.query(Doctor.id).order_by(func.random()).limit(200)]
+        admin_id = db.session.query(Patient.id).filter(Patient.is_admin == True).scalar()
+        usernames = dict(db.session.query(Patient.id, Patient.username).filter(Patient.id.in_(patients)).all())
+    if not patients or not doctors:
+        raise SystemExit('No patients or doctors found, run bench/generate_data.py first')
+    return rng, patients, doctors, admin_id, usernames
+
+def scenario_request(name, i, client, rng, patients, doctors, admin_id, usernames, password):
+    patient_id = patients[i % len(patients)]
+    doctor_id = doctors[i % len(doctors)]
+    day = (date.today() + timedelta(days=1 + i % 14)).isoformat()
+    if name == 'login':
+        return lambda: client.post('/login', json={'username': usernames[patient_id], 'password': password}), None
+    if name == 'available_slots':
+        return lambda: client.get(f'/doctors/{doctor_id}/available-slots?date={day}'), {'user_id': patient_id}
+    if name == 'book':
+        slot = 9 * 60 + rng.randrange(16) * 30
+        payload = {'doctor_id': doctor_id, 'date': day, 'time': f'{slot // 60:02d}:{slot % 60:02d}'}
+        return lambda: client.post('/appointment', json=payload), {'user_id': patient_id}
+    if name == 'patient_dashboard':
+        return lambda: client.get(f'/patient/{patient_id}/dashboard'), {'user_id': patient_id}
+    if name == 'doctor_dashboard':
+        return lambda: client.get(f'/doctor/{doctor_id}/dashboard'), {'doctor_id': doctor_id}
+    if name == 'admin_dashboard':
+        return lambda: client.get('/admin/dashboard'), {'user_id': admin_id, 'is_admin': True}
+    if name == 'patient_history':
+        return lambda: client.get(f'/patient/{patient_id}/history'), {'user_id': patient_id}
+    if name == 'admin_search':
+        term = (usernames[patient_id], FIRST_NAMES[i % len(FIRST_NAMES)], DIAGNOSES[i % len(DIAGNOSES)])[i % 3]
+        return lambda: client.get('/admin/search', query_string={'q': term}), {'user_id': admin_id, 'is_admin': True}
+
+def run_scenario(app, name, requests_count, concurrency, ids, password):
+    import time
+
+    def call(i):
+        client = app.test_client()
+        send, session_values = scenario_request(name, i, client, *ids, password)
+        if session_values:
+            with client.session_transaction() as s:
+                s.update(session_values)
+        start = time.perf_counter()
+        response = send()
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    results, elapsed = run_concurrently(call, requests_count, concurrency)
+    summary = {'requests': requests_count, 'errors': sum(1 for code, _ in results if code not in EXPECTED[name])}
+    summary.update(latency_summary([ms for _, ms in results], elapsed))
+    return summary
+
+def row_counts(app):
+    from models.database import db, Patient, Doctor, Appointment, Treatment
+    with app.app_context():
+        return {model.__tablename__: db.session.query(model).count() for model in (Patient, Doctor, Appointment, Treatment)}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Drive hot routes through the Flask test client and report latency percentiles as JSON')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--scenarios', default=','.join(EXPECTED))
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--redis-cache', action='store_true', help='use the configured Redis cache instead of an in-process one')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+    if args.redis_cache:
+        from app import app
+    else:
+        from bench.common import use_local_cache
+        app = use_local_cache()
+    ids = sample_ids(app, args.seed)
+    report = {
+        'database': app.config['SQLALCHEMY_DATABASE_URI'],
+        'rows': row_counts(app),
+        'concurrency': args.concurrency,
+        'scenarios': {
+            name: run_scenario(app, name, args.requests, args.concurrency, ids, args.password)
+            for name in args.scenarios.split(',')
+        },
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
@@ -0,0 +1,68 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = {
+    'app': {'budget_ms': 900, 'deferred': ('celery', 'kombu', 'reportlab', 'requests')},
+    'tasks.celery_tasks': {'budget_ms': 400, 'deferred': ('reportlab', 'requests')},
+}
+
+def parse_importtime(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        rows.append((name.rstrip(), int(cumulative)))
+    return rows
+
+def measure(module, trace=False):
+    code = f"import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+    result = subprocess.run(
+        [sys.executable] + (['-X', 'importtime'] if trace else []) + ['-c', code],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1]) * 1000, parse_importtime(result.stderr)
+
+def slowest_children(rows, module, limit):
+    for index, (name, _) in enumerate(rows):
+        if name.strip() == module and len(name) - len(name.lstrip()) == 1:
+            start = max((i for i in range(index) if len(rows[i][0]) - len(rows[i][0].lstrip()) == 1), default=-1) + 1
+            children = [(name.strip(), us) for name, us in rows[start:index] if len(name) - len(name.lstrip()) == 3]
+            return [{'module': name, 'ms': round(us / 1000, 1)} for name, us in sorted(children, key=lambda c: -c[1])[:limit]]
+    return []
+
+def check(module, budget_ms, deferred, runs, top):
+    timings = [measure(module)[0] for _ in range(runs)]
+    _, rows = measure(module, trace=True)
+    loaded = {name.strip() for name, _ in rows}
+    deferred_loaded = sorted(pkg for pkg in deferred if any(name == pkg or name.startswith(pkg + '.') for name in loaded))
+    median_ms = statistics.median(timings)
+    return {
+        'runs': runs,
+        'median_ms': round(median_ms, 1),
+        'max_ms': round(max(timings), 1),
+        'budget_ms': budget_ms,
+        'within_budget': median_ms <= budget_ms and not deferred_loaded,
+        'deferred_loaded': deferred_loaded,
+        'slowest_imports': slowest_children(rows, module, top),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cold-start import time of the web app and Celery worker modules against a budget')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='slowest direct imports to report per module')
+    parser.add_argument('--modules', default=','.join(TARGETS))
+    parser.add_argument('--budget-ms', type=float, help='override the budget for every module')
+    args = parser.parse_args()
+    report = {}
+    for module in args.modules.split(','):
+        target = TARGETS.get(module, {'budget_ms': 600, 'deferred': ()})
+        report[module] = check(module, args.budget_ms or target['budget_ms'], target['deferred'], args.runs, args.top)
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if all(result['within_budget'] for result in report.values()) else 1)
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.common import percentile, use_local_cache
+
+def setup(accounts, stored_method):
+    from models.database import db, Patient, Doctor
+    from werkzeug.security import generate_password_hash
+    app = use_local_cache()
+    password_hash = generate_password_hash('bench', method=stored_method)
+    with app.app_context():
+        db.session.execute(db.insert(Patient), [
+            {'username': f'patient_{i}', 'password_hash': password_hash, 'full_name': f'Patient {i}'} for i in range(accounts)
+        ])
+        db.session.execute(db.insert(Doctor), [
+            {'username': f'doctor_{i}', 'password_hash': password_hash, 'name': f'Doctor {i}', 'department_id': 1} for i in range(accounts)
+        ])
+        db.session.commit()
+    return app
+
+def run(app, accounts, logins, concurrency):
+    from models.database import db
+    from sqlalchemy import event
+    queries = [0]
+
+    def count(*args):
+        queries[0] += 1
+
+    def login(i):
+        client = app.test_client()
+        username = f"{'doctor' if i % 2 else 'patient'}_{(i // 2) % accounts}"
+        start = time.perf_counter()
+        response = client.post('/login', json={'username': username, 'password': 'bench'})
+        return response.status_code, (time.perf_counter() - start) * 1000
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    event.remove(engine, 'before_cursor_execute', count)
+    latencies = [ms for _, ms in results]
+    return {
+        'logins': logins,
+        'ok': sum(1 for code, _ in results if code == 200),
+        'busy': sum(1 for code, _ in results if code == 503),
+        'failed': sum(1 for code, _ in results if code not in (200, 503)),
+        'logins_per_sec': round(logins / elapsed, 1),
+        'queries_per_login': round(queries[0] / logins, 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Login throughput with the configured password hash method')
+    parser.add_argument('--accounts', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=400)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--stored-method', default='scrypt', help='hash method of the seeded accounts; differs from PASSWORD_HASH_METHOD to exercise rehash-on-login')
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        app = setup(args.accounts, args.stored_method)
+        from models.passwords import password_method, HASH_WORKERS
+        first = run(app, args.accounts, args.logins, args.concurrency)
+        second = run(app, args.accounts, args.logins, args.concurrency)
+        print(json.dumps({
+            'stored_method': args.stored_method,
+            'password_method': password_method(),
+            'hash_workers': HASH_WORKERS,
+            'first_pass': first,
+            'second_pass': second,
+        }, indent=2))
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from models.database import db, DoctorAvailability
+
+MAX_TEMPLATE_DAYS = 366
+
+class InvalidTimeRange(ValueError):
+    pass
+
+def parse_slot_ranges(slots, label):
+    ranges = set()
+    for slot in slots:
+        if not slot.get('start') or not slot.get('end'):
+            continue
+        start_time = datetime.strptime(slot['start'], '%H:%M').time()
+        end_time = datetime.strptime(slot['end'], '%H:%M').time()
+        if start_time >= end_time:
+            raise InvalidTimeRange(f'Invalid time range on {label}: start time must be before end time')
+        ranges.add((start_time, end_time))
+    return ranges
+
+def expand_weekly_template(date_from, date_to, weekdays):
+    days = {}
+    day = date_from
+    while day <= date_to:
+        slots = weekdays.get(day.weekday())
+        if slots is not None:
+            days[day] = set(slots)
+        day += timedelta(days=1)
+    return days
+
+def sync_doctor_availability(doctor_id, desired):
+    if not desired:
+        return {'inserted': 0, 'deleted': 0, 'changed_dates': []}
+    existing = db.session.query(
+        DoctorAvailability.id, DoctorAvailability.date, DoctorAvailability.start_time,
+        DoctorAvailability.end_time, DoctorAvailability.is_enabled
+    ).filter(DoctorAvailability.doctor_id == doctor_id, DoctorAvailability.date.in_(list(desired))).all()
+
+    kept = set()
+    to_delete = []
+    changed_dates = set()
+    for row_id, day, start, end, is_enabled in existing:
+        if is_enabled and (start, end) in desired[day]:
+            kept.add((day, start, end))
+        else:
+            to_delete.append(row_id)
+            changed_dates.add(day)
+    to_insert = []
+    for day, slots in desired.items():
+        for start, end in slots:
+            if (day, start, end) not in kept:
+                to_insert.append({'doctor_id': doctor_id, 'date': day, 'start_time': start, 'end_time': end, 'is_enabled': True})
+                changed_dates.add(day)
+
+    if to_delete:
+        DoctorAvailability.query.filter(DoctorAvailability.id.in_(to_delete)).delete(synchronize_session=False)
+    if to_insert:
+        db.session.execute(insert(DoctorAvailability), to_insert)
+    db.session.commit()
+    return {'inserted': len(to_insert), 'deleted': len(to_delete), 'changed_dates': sorted(changed_dates)}
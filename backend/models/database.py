@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from datetime import datetime
+from models.passwords import hash_password
 
 db = SQLAlchemy()
 
@@ -21,7 +22,7 @@ class Patient(db.Model):
     appointments = db.relationship('Appointment', backref='patient', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -49,7 +50,7 @@ class Doctor(db.Model):
     appointments = db.relationship('Appointment', backref='doctor', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
@@ -68,8 +69,15 @@ class Appointment(db.Model):
     treatment = db.relationship('Treatment', backref='appointment', uselist=False, cascade='all, delete-orphan')
     
     __table_args__ = (
-        db.UniqueConstraint('doctor_id', 'date', 'time', name='unique_appointment_slot'),
-        db.Index('idx_appointment_lookup', 'doctor_id', 'date', 'status'),
+        db.Index(
+            'unique_active_appointment_slot', 'doctor_id', 'date', 'time', unique=True,
+            sqlite_where=db.text("status IN ('booked', 'confirmed')"),
+            postgresql_where=db.text("status IN ('booked', 'confirmed')")
+        ),
+        db.Index('idx_appointment_doctor_order', 'doctor_id', 'date', 'time', 'id'),
+        db.Index('idx_appointment_patient_order', 'patient_id', 'date', 'time', 'id'),
+        db.Index('idx_appointment_date', 'date'),
+        {'sqlite_autoincrement': True},
     )
     
 class Treatment(db.Model):
@@ -83,6 +91,10 @@ class Treatment(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('idx_treatment_appointment', 'appointment_id'),
+    )
+
 class DoctorAvailability(db.Model):
     __tablename__ = 'doctor_availability'
     id = db.Column(db.Integer, primary_key=True)
@@ -98,4 +110,52 @@ class DoctorAvailability(db.Model):
         db.UniqueConstraint('doctor_id', 'date', 'start_time', 'end_time', name='unique_slot'),
         db.Index('idx_availability_lookup', 'doctor_id', 'date', 'is_enabled'),
     )
-    
\ No newline at end of file
+    
+class DashboardCounters(db.Model):
+    __tablename__ = 'dashboard_counters'
+    id = db.Column(db.Integer, primary_key=True)
+    total_patients = db.Column(db.Integer, nullable=False, default=0)
+    total_doctors = db.Column(db.Integer, nullable=False, default=0)
+    total_appointments = db.Column(db.Integer, nullable=False, default=0)
+    pending_appointments = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def bump(cls, **deltas):
+        values = {getattr(cls, name): getattr(cls, name) + delta for name, delta in deltas.items() if delta}
+        if values:
+            values[cls.updated_at] = datetime.utcnow()
+            cls.query.filter_by(id=1).update(values, synchronize_session=False)
+
+class FailedWebhook(db.Model):
+    __tablename__ = 'failed_webhook'
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), nullable=False)
+    payload = db.Column(db.JSON, nullable=False)
+    error = db.Column(db.Text)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    replays = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('idx_failed_webhook_pending', 'delivered_at', 'replays'),
+    )
+
+class NotificationOutbox(db.Model):
+    __tablename__ = 'notification_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    appointment_id = db.Column(db.Integer, nullable=False)
+    event = db.Column(db.String(20), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    payload = db.Column(db.JSON)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    task_id = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    dispatched_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.UniqueConstraint('appointment_id', 'event', 'version', name='unique_notification'),
+        db.Index('idx_notification_pending', 'status', 'appointment_id', 'version'),
+    )
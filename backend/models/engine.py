@@ -0,0 +1,40 @@
+import os
+from sqlalchemy import event
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+def env_bool(name, default):
+    return os.getenv(name, default).lower() in ('1', 'true', 'yes')
+
+def database_uri():
+    return os.getenv('DATABASE_URL', 'sqlite:///hospital.db')
+
+def sqlite_pragmas():
+    return {
+        'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000),
+        'mmap_size': env_int('SQLITE_MMAP_SIZE', 268435456),
+    }
+
+def engine_options(uri):
+    if uri.startswith('sqlite'):
+        return {'connect_args': {'timeout': env_int('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000}}
+    return {
+        'pool_size': env_int('DB_POOL_SIZE', 10),
+        'max_overflow': env_int('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': env_int('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': env_int('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': env_bool('DB_POOL_PRE_PING', 'true'),
+    }
+
+def install_sqlite_pragmas(engine, pragmas=None):
+    pragmas = pragmas or sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from models.database import db, Appointment, NotificationOutbox
+
+NOTIFICATION_TASKS = {
+    'confirmed': 'tasks.send_appointment_confirmed',
+    'cancelled': 'tasks.send_appointment_cancelled',
+}
+COALESCE_SECONDS = 5
+DISPATCH_BATCH_SIZE = 500
+DISPATCH_LOCK = 'notifications:dispatch_lock'
+
+def enqueue_notification(appointment_id, event, payload=None):
+    latest = NotificationOutbox.query.filter_by(appointment_id=appointment_id).order_by(NotificationOutbox.version.desc()).first()
+    if latest and latest.event == event:
+        return None
+    row = NotificationOutbox(
+        appointment_id=appointment_id,
+        event=event,
+        version=latest.version + 1 if latest else 1,
+        payload=payload or {}
+    )
+    db.session.add(row)
+    return row
+
+def discard_notifications(*criteria):
+    appointment_ids = db.session.query(Appointment.id).filter(*criteria)
+    NotificationOutbox.query.filter(NotificationOutbox.appointment_id.in_(appointment_ids.scalar_subquery())).delete(synchronize_session=False)
+
+def task_args(row):
+    if row.event == 'cancelled':
+        return [row.appointment_id, (row.payload or {}).get('reason')]
+    return [row.appointment_id]
+
+def collapse(rows):
+    send, superseded = [], []
+    for _, group in groupby(rows, key=lambda row: row.appointment_id):
+        group = list(group)
+        latest = group[-1]
+        superseded += group[:-1]
+        if latest.event == 'cancelled' and len(group) > 1 and group[0].version == 1:
+            superseded.append(latest)
+        else:
+            send.append(latest)
+    return send, superseded
+
+def dispatch_notifications(send_task, limit=DISPATCH_BATCH_SIZE, min_age=0):
+    cutoff = datetime.utcnow() - timedelta(seconds=min_age)
+    rows = NotificationOutbox.query.filter(
+        NotificationOutbox.status == 'pending', NotificationOutbox.created_at <= cutoff
+    ).order_by(
+        NotificationOutbox.appointment_id, NotificationOutbox.version
+    ).limit(limit).all()
+    send, superseded = collapse(rows)
+    now = datetime.utcnow()
+    for row in superseded:
+        row.status = 'superseded'
+        row.dispatched_at = now
+    sent = 0
+    try:
+        for row in send:
+            row.task_id = send_task(NOTIFICATION_TASKS[row.event], args=task_args(row)).id
+            row.status = 'sent'
+            row.dispatched_at = now
+            sent += 1
+    except Exception as e:
+        print(f"Notification dispatch interrupted: {e}")
+    db.session.commit()
+    return {'sent': sent, 'superseded': len(superseded), 'pending': len(send) - sent}
@@ -0,0 +1,46 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+from models.engine import env_int
+
+HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', 4)
+HASH_QUEUE_SIZE = env_int('PASSWORD_HASH_QUEUE', 64)
+HASH_WAIT_SECONDS = env_int('PASSWORD_HASH_WAIT_SECONDS', 5)
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(HASH_WORKERS + HASH_QUEUE_SIZE)
+
+class HashingBusy(RuntimeError):
+    pass
+
+def password_method():
+    return os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+
+@lru_cache(maxsize=8)
+def method_prefix(method):
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+def hash_password(password):
+    return generate_password_hash(password, method=password_method())
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != method_prefix(password_method())
+
+def pooled(fn, *args):
+    if not _slots.acquire(timeout=HASH_WAIT_SECONDS):
+        raise HashingBusy('Password hashing queue is full')
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future.result()
+
+def verify_password(password_hash, password):
+    return pooled(check_password_hash, password_hash, password)
+
+def hash_password_pooled(password):
+    return pooled(hash_password, password)
@@ -0,0 +1,67 @@
+from datetime import datetime
+from sqlalchemy import tuple_, func, literal, union_all, select, false
+from sqlalchemy.orm import joinedload
+from models.database import db, Appointment, Doctor, Patient, DashboardCounters
+
+def doctors_with_department():
+    return Doctor.query.options(joinedload(Doctor.department))
+
+def appointments_with_relations():
+    return Appointment.query.options(
+        joinedload(Appointment.patient),
+        joinedload(Appointment.doctor).joinedload(Doctor.department),
+        joinedload(Appointment.treatment),
+    )
+
+def encode_cursor(appointment):
+    return f"{appointment.date.isoformat()}_{appointment.time.strftime('%H:%M:%S')}_{appointment.id}"
+
+def decode_cursor(cursor):
+    date_str, time_str, appointment_id = cursor.split('_')
+    return (datetime.strptime(date_str, '%Y-%m-%d').date(), datetime.strptime(time_str, '%H:%M:%S').time(), int(appointment_id))
+
+def appointment_page(query, limit, cursor=None, status=None, date_from=None, date_to=None):
+    if status:
+        query = query.filter(Appointment.status == status)
+    if date_from:
+        query = query.filter(Appointment.date >= date_from)
+    if date_to:
+        query = query.filter(Appointment.date <= date_to)
+    if cursor:
+        query = query.filter(tuple_(Appointment.date, Appointment.time, Appointment.id) < cursor)
+    rows = query.order_by(Appointment.date.desc(), Appointment.time.desc(), Appointment.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+def appointment_counts(*criteria):
+    total, pending = db.session.query(
+        func.count(Appointment.id),
+        func.count(Appointment.id).filter(Appointment.status == 'booked'),
+    ).filter(*criteria).one()
+    return total, pending
+
+def refresh_dashboard_counters():
+    total_patients, total_doctors, total_appointments, pending_appointments = db.session.query(
+        db.session.query(func.count(Patient.id)).filter(Patient.is_admin == False).scalar_subquery(),
+        db.session.query(func.count(Doctor.id)).scalar_subquery(),
+        db.session.query(func.count(Appointment.id)).scalar_subquery(),
+        db.session.query(func.count(Appointment.id)).filter(Appointment.status == 'booked').scalar_subquery(),
+    ).one()
+    counters = db.session.get(DashboardCounters, 1) or DashboardCounters(id=1)
+    counters.total_patients = total_patients
+    counters.total_doctors = total_doctors
+    counters.total_appointments = total_appointments
+    counters.pending_appointments = pending_appointments
+    counters.updated_at = datetime.utcnow()
+    db.session.add(counters)
+    db.session.commit()
+    return counters
+
+def find_credentials(username):
+    patients = select(
+        literal('patient').label('role'), Patient.id, Patient.password_hash, Patient.is_admin, Patient.full_name.label('name')
+    ).where(Patient.username == username)
+    doctors = select(
+        literal('doctor'), Doctor.id, Doctor.password_hash, false(), Doctor.name
+    ).where(Doctor.username == username)
+    return sorted(db.session.execute(union_all(patients, doctors)).all(), key=lambda row: row.role != 'patient')
@@ -0,0 +1,163 @@
+from sqlalchemy import or_
+from models.database import db, Patient, Doctor, Appointment, Treatment
+from models.queries import doctors_with_department
+
+SEARCH_TABLE = 'search_index'
+MIN_TERM_LENGTH = 3
+
+# rowid = source id * KIND_SLOTS + kind code, so triggers touch index rows by rowid without scanning
+KIND_SLOTS = 4
+SOURCES = {
+    'patient': {
+        'code': 1,
+        'table': 'user',
+        'title': "coalesce({row}.full_name, '')",
+        'body': "{row}.username || ' ' || coalesce({row}.email, '') || ' ' || coalesce({row}.phone, '')",
+        'where': '{row}.is_admin = 0',
+        'columns': ('full_name', 'username', 'email', 'phone', 'is_admin'),
+    },
+    'doctor': {
+        'code': 2,
+        'table': 'doctor',
+        'title': "{row}.name",
+        'body': "{row}.username || ' ' || coalesce({row}.email, '') || ' ' || coalesce({row}.phone, '') || ' ' || coalesce({row}.qualification, '')",
+        'where': None,
+        'columns': ('name', 'username', 'email', 'phone', 'qualification'),
+    },
+    'treatment': {
+        'code': 3,
+        'table': 'treatment',
+        'title': "coalesce({row}.diagnosis, '')",
+        'body': "coalesce({row}.prescription, '')",
+        'where': None,
+        'columns': ('diagnosis', 'prescription'),
+    },
+}
+KINDS = {source['code']: kind for kind, source in SOURCES.items()}
+SEARCH_KINDS = tuple(SOURCES)
+
+def index_select(source, row, table=None):
+    sql = f"SELECT {row}.id * {KIND_SLOTS} + {source['code']}, {source['title'].format(row=row)}, {source['body'].format(row=row)}"
+    if table:
+        sql += f' FROM "{table}" AS {row}'
+    if source['where']:
+        sql += f" WHERE {source['where'].format(row=row)}"
+    return sql
+
+def trigger_statements(kind, source):
+    table, rowid = source['table'], f"old.id * {KIND_SLOTS} + {source['code']}"
+    insert = f"INSERT INTO {SEARCH_TABLE}(rowid, title, body) {index_select(source, 'new')};"
+    delete = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {rowid};"
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS search_{kind}_insert AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_{kind}_update AFTER UPDATE OF {", ".join(source["columns"])} ON "{table}" '
+        f'BEGIN {delete} {insert} END',
+        f'CREATE TRIGGER IF NOT EXISTS search_{kind}_delete AFTER DELETE ON "{table}" BEGIN {delete} END',
+    ]
+
+def drop_search_triggers():
+    if not fts_available():
+        return
+    conn = db.session.connection()
+    for kind in SOURCES:
+        for event in ('insert', 'update', 'delete'):
+            conn.exec_driver_sql(f"DROP TRIGGER IF EXISTS search_{kind}_{event}")
+    db.session.commit()
+
+def fts_available():
+    return db.engine.dialect.name == 'sqlite'
+
+def ensure_search_index():
+    if not fts_available():
+        return False
+    conn = db.session.connection()
+    exists = conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (SEARCH_TABLE,)
+    ).first()
+    if not exists:
+        conn.exec_driver_sql(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(title, body, tokenize='trigram')")
+        conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+    for kind, source in SOURCES.items():
+        for statement in trigger_statements(kind, source):
+            conn.exec_driver_sql(statement)
+    db.session.commit()
+    if not exists:
+        rebuild_search_index()
+    return True
+
+def rebuild_search_index():
+    if not fts_available():
+        return
+    conn = db.session.connection()
+    conn.exec_driver_sql(f"DELETE FROM {SEARCH_TABLE}")
+    for source in SOURCES.values():
+        conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}(rowid, title, body) {index_select(source, 't', source['table'])}")
+    conn.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    db.session.commit()
+
+def search_terms(query):
+    return [term for term in (query or '').split() if len(term) >= MIN_TERM_LENGTH]
+
+def match_expression(terms):
+    return ' '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+def search_index(terms, kinds, limit, offset):
+    codes = ', '.join(str(SOURCES[kind]['code']) for kind in kinds)
+    rows = db.session.connection().exec_driver_sql(
+        f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ? "
+        f"AND rowid % {KIND_SLOTS} IN ({codes}) ORDER BY rank, rowid DESC LIMIT ? OFFSET ?",
+        (match_expression(terms), limit, offset)
+    ).all()
+    return [(KINDS[rowid % KIND_SLOTS], rowid // KIND_SLOTS) for rowid, in rows]
+
+def search_fallback(terms, kinds, limit, offset):
+    def matching(*columns):
+        return [or_(*[column.ilike(f'%{term}%') for column in columns]) for term in terms]
+
+    hits = []
+    if 'patient' in kinds:
+        hits += [('patient', id) for id, in db.session.query(Patient.id).filter(
+            Patient.is_admin == False, *matching(Patient.full_name, Patient.username, Patient.email, Patient.phone)
+        ).order_by(Patient.full_name).limit(offset + limit)]
+    if 'doctor' in kinds:
+        hits += [('doctor', id) for id, in db.session.query(Doctor.id).filter(
+            *matching(Doctor.name, Doctor.username, Doctor.email, Doctor.phone, Doctor.qualification)
+        ).order_by(Doctor.name).limit(offset + limit)]
+    if 'treatment' in kinds:
+        hits += [('treatment', id) for id, in db.session.query(Treatment.id).filter(
+            *matching(Treatment.diagnosis, Treatment.prescription)
+        ).order_by(Treatment.id.desc()).limit(offset + limit)]
+    return hits[offset:offset + limit]
+
+def load_results(hits):
+    ids = {kind: [id for hit_kind, id in hits if hit_kind == kind] for kind in SOURCES}
+    found = {}
+    if ids['patient']:
+        for p in Patient.query.filter(Patient.id.in_(ids['patient'])):
+            found[('patient', p.id)] = {'name': p.full_name, 'username': p.username, 'email': p.email, 'phone': p.phone}
+    if ids['doctor']:
+        for d in doctors_with_department().filter(Doctor.id.in_(ids['doctor'])):
+            found[('doctor', d.id)] = {
+                'name': d.name, 'username': d.username, 'email': d.email, 'phone': d.phone,
+                'department': d.department.name if d.department else None, 'qualification': d.qualification,
+            }
+    if ids['treatment']:
+        rows = db.session.query(Treatment, Appointment, Patient.full_name, Doctor.name).join(
+            Appointment, Appointment.id == Treatment.appointment_id
+        ).join(Patient, Patient.id == Appointment.patient_id).join(
+            Doctor, Doctor.id == Appointment.doctor_id
+        ).filter(Treatment.id.in_(ids['treatment']))
+        for t, a, patient_name, doctor_name in rows:
+            found[('treatment', t.id)] = {
+                'diagnosis': t.diagnosis, 'prescription': t.prescription, 'appointment_id': a.id,
+                'patient_id': a.patient_id, 'patient': patient_name, 'doctor': doctor_name,
+                'date': a.date.strftime('%Y-%m-%d'),
+            }
+    return [{'type': kind, 'id': id, **found[(kind, id)]} for kind, id in hits if (kind, id) in found]
+
+def search(query, kinds, limit, offset=0):
+    terms = search_terms(query)
+    if not terms:
+        return None
+    hits = (search_index if fts_available() else search_fallback)(terms, kinds, limit + 1, offset)
+    return load_results(hits[:limit]), len(hits) > limit
@@ -0,0 +1,50 @@
+import os
+from sqlalchemy import inspect, MetaData, Table, Column, Integer, Index
+from models.database import db, Patient, Department, DashboardCounters
+from models.queries import refresh_dashboard_counters
+from models.search import ensure_search_index
+
+DEPARTMENTS = [
+    ('Cardiology', 'Heart and cardiovascular system care'),
+    ('Neurology', 'Brain and nervous system treatment'),
+    ('Orthopedics', 'Bone, joint, and muscle care'),
+    ('Pediatrics', 'Medical care for children'),
+    ('Dermatology', 'Skin, hair, and nail treatment'),
+    ('General Medicine', 'Primary and general healthcare'),
+]
+
+# replaced by idx_appointment_doctor_order / idx_appointment_patient_order, which match the keyset sort
+OBSOLETE_INDEXES = {
+    'appointment': ('idx_appointment_lookup', 'idx_appointment_doctor_schedule', 'idx_appointment_patient_schedule'),
+}
+
+def drop_obsolete_indexes():
+    inspector = inspect(db.engine)
+    for table, names in OBSOLETE_INDEXES.items():
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        for name in names:
+            if name in existing:
+                Index(name, Table(table, MetaData(), Column('id', Integer)).c.id).drop(db.engine)
+
+def init_db():
+    db.create_all()
+    drop_obsolete_indexes()
+    ensure_search_index()
+    admin = Patient.query.filter_by(username='admin').first()
+    if not admin:
+        admin = Patient(
+            username='admin',
+            is_admin=True,
+            full_name='System Administrator',
+            email=os.getenv('ADMIN_EMAIL', 'admin@hospital.com')
+        )
+        admin.set_password(os.getenv('ADMIN_PASSWORD', 'admin'))
+        db.session.add(admin)
+        db.session.commit()
+
+    if Department.query.count() == 0:
+        db.session.add_all([Department(name=name, description=description) for name, description in DEPARTMENTS])
+        db.session.commit()
+
+    if not db.session.get(DashboardCounters, 1):
+        refresh_dashboard_counters()
@@ -0,0 +1,142 @@
+import heapq
+from collections import defaultdict
+from datetime import datetime, time
+from sqlalchemy import exists
+from sqlalchemy.dialects import postgresql, sqlite
+from models.database import db, Appointment, Doctor, Department, DoctorAvailability
+
+SLOT_MINUTES = 30
+ACTIVE_STATUSES = ('booked', 'confirmed')
+
+def to_minutes(t):
+    return t.hour * 60 + t.minute
+
+def from_minutes(minutes):
+    return time(minutes // 60, minutes % 60)
+
+def format_minutes(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def expand_windows(windows, slot_minutes=SLOT_MINUTES):
+    slots = []
+    for start, end in sorted(windows):
+        cursor = start
+        while cursor + slot_minutes <= end:
+            if not slots or cursor >= slots[-1][1]:
+                slots.append((cursor, cursor + slot_minutes))
+            cursor += slot_minutes
+    return slots
+
+def subtract_booked(slots, booked, slot_minutes=SLOT_MINUTES):
+    booked = sorted(booked)
+    free = []
+    i = 0
+    for start, end in slots:
+        while i < len(booked) and booked[i] + slot_minutes <= start:
+            i += 1
+        if i < len(booked) and booked[i] < end:
+            continue
+        free.append((start, end))
+    return free
+
+def compute_free_slots(windows, booked, after=None, slot_minutes=SLOT_MINUTES):
+    slots = subtract_booked(expand_windows(windows, slot_minutes), booked, slot_minutes)
+    if after is not None:
+        slots = [s for s in slots if s[0] > after]
+    return slots
+
+def day_free_slots(doctor_id, day):
+    windows = db.session.query(DoctorAvailability.start_time, DoctorAvailability.end_time).filter(
+        DoctorAvailability.doctor_id == doctor_id,
+        DoctorAvailability.date == day,
+        DoctorAvailability.is_enabled == True
+    ).all()
+    booked = db.session.query(Appointment.time).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == day,
+        Appointment.status.in_(ACTIVE_STATUSES)
+    ).all()
+    return compute_free_slots([(to_minutes(s), to_minutes(e)) for s, e in windows], [to_minutes(t) for t, in booked])
+
+def format_slots(free, current_time=None):
+    after = to_minutes(current_time) if current_time else None
+    return [{'start': format_minutes(s), 'end': format_minutes(e)} for s, e in free if after is None or s > after]
+
+def search_free_slots(date_from, date_to, department_id=None, now=None, limit=None):
+    window_query = db.session.query(
+        DoctorAvailability.doctor_id, DoctorAvailability.date, DoctorAvailability.start_time, DoctorAvailability.end_time,
+        Doctor.name, Department.id, Department.name
+    ).join(Doctor, Doctor.id == DoctorAvailability.doctor_id).join(Department, Department.id == Doctor.department_id).filter(
+        DoctorAvailability.date >= date_from,
+        DoctorAvailability.date <= date_to,
+        DoctorAvailability.is_enabled == True
+    )
+    if department_id is not None:
+        window_query = window_query.filter(Doctor.department_id == department_id)
+    windows = defaultdict(list)
+    doctors = {}
+    for doctor_id, day, start, end, doctor_name, dept_id, dept_name in window_query:
+        windows[(doctor_id, day)].append((to_minutes(start), to_minutes(end)))
+        doctors[doctor_id] = (doctor_name, dept_id, dept_name)
+    if not windows:
+        return []
+
+    booked = defaultdict(list)
+    booked_query = db.session.query(Appointment.doctor_id, Appointment.date, Appointment.time).filter(
+        Appointment.doctor_id.in_(doctors),
+        Appointment.date >= date_from,
+        Appointment.date <= date_to,
+        Appointment.status.in_(ACTIVE_STATUSES)
+    )
+    for doctor_id, day, t in booked_query:
+        booked[(doctor_id, day)].append(to_minutes(t))
+
+    def candidates():
+        for (doctor_id, day), day_windows in windows.items():
+            if now and day < now.date():
+                continue
+            after = to_minutes(now.time()) if now and day == now.date() else None
+            for start, end in compute_free_slots(day_windows, booked[(doctor_id, day)], after):
+                yield (day, start, doctor_id, end)
+
+    ordered = heapq.nsmallest(limit, candidates()) if limit else sorted(candidates())
+    return [
+        {'doctor_id': doctor_id, 'doctor': doctors[doctor_id][0], 'department_id': doctors[doctor_id][1], 'department': doctors[doctor_id][2],
+         'date': day.strftime('%Y-%m-%d'), 'start': format_minutes(start), 'end': format_minutes(end)}
+        for day, start, doctor_id, end in ordered
+    ]
+
+def slot_status(doctor_id, day, slot_time):
+    minute = to_minutes(slot_time)
+    overlap = [Appointment.time >= from_minutes(max(minute - SLOT_MINUTES + 1, 0))]
+    if minute + SLOT_MINUTES < 24 * 60:
+        overlap.append(Appointment.time < from_minutes(minute + SLOT_MINUTES))
+    taken = exists().where(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == day,
+        Appointment.status.in_(ACTIVE_STATUSES),
+        *overlap
+    )
+    rows = db.session.query(DoctorAvailability.start_time, DoctorAvailability.end_time, taken).filter(
+        DoctorAvailability.doctor_id == doctor_id,
+        DoctorAvailability.date == day,
+        DoctorAvailability.is_enabled == True
+    ).all()
+    if (minute, minute + SLOT_MINUTES) not in expand_windows([(to_minutes(s), to_minutes(e)) for s, e, _ in rows]):
+        return 'unavailable'
+    return 'booked' if rows[0][2] else 'available'
+
+def claim_slot(patient_id, doctor_id, day, slot_time, reason=None):
+    now = datetime.utcnow()
+    values = dict(
+        patient_id=patient_id, doctor_id=doctor_id, date=day, time=slot_time,
+        reason=reason, status='booked', created_at=now, updated_at=now
+    )
+    dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(db.session.get_bind().dialect.name)
+    if dialect is None:
+        appointment = Appointment(**values)
+        db.session.add(appointment)
+        db.session.flush()
+        return appointment.id
+    stmt = dialect.insert(Appointment).values(**values).on_conflict_do_nothing().returning(Appointment.id)
+    return db.session.execute(stmt).scalar()
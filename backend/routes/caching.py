@@ -0,0 +1,179 @@
+import time
+import threading
+from collections import OrderedDict
+from routes.metrics import count_cache
+
+DIRECTORY_GENERATION_KEY = 'directory:generation'
+LOCK_TIMEOUT = 10
+LOCK_WAIT_SECONDS = 2
+LOCK_POLL_INTERVAL = 0.05
+SLOT_CACHE_TIMEOUT = 300
+SLOT_GENERATION_TIMEOUT = 24 * 60 * 60
+LOCAL_SLOT_CACHE_SIZE = 256
+LOCAL_SLOT_CACHE_TTL = 2
+
+class LocalLRU:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+local_slots = LocalLRU(LOCAL_SLOT_CACHE_SIZE, LOCAL_SLOT_CACHE_TTL)
+local_slot_generations = LocalLRU(LOCAL_SLOT_CACHE_SIZE, LOCAL_SLOT_CACHE_TTL)
+
+def get_cache():
+    from app import cache
+    return cache
+
+def record(outcome):
+    count_cache(outcome)
+    try:
+        get_cache().cache.inc(f'cache:stats:{outcome}')
+    except Exception as e:
+        print(f"Cache stats update failed: {e}")
+
+def initial_generation(timeout):
+    # expiring counters restart from the clock so they never reuse a generation that still has cached values
+    return int(time.time() * 1000) if timeout else 1
+
+def generation(key, timeout=0):
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, initial_generation(timeout), timeout=timeout)
+        value = cache.get(key) or initial_generation(timeout)
+    return int(value)
+
+def bump_generation(key, timeout=0):
+    try:
+        cache = get_cache()
+        if cache.get(key) is None:
+            cache.add(key, initial_generation(timeout), timeout=timeout)
+        cache.cache.inc(key)
+    except Exception as e:
+        print(f"Cache invalidation failed for {key}: {e}")
+
+def single_flight(key, loader, timeout):
+    cache = get_cache()
+    value = cache.get(key)
+    if value is not None:
+        record('hits')
+        return value
+    record('misses')
+    lock_key = f'lock:{key}'
+    if cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        try:
+            value = loader()
+            cache.set(key, value, timeout=timeout)
+            return value
+        finally:
+            cache.delete(lock_key)
+    deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            return value
+    return loader()
+
+def cached_value(key, loader, timeout=300):
+    try:
+        return single_flight(key, loader, timeout)
+    except Exception as e:
+        print(f"Cache unavailable for {key}: {e}")
+        return loader()
+
+def directory_generation():
+    return generation(DIRECTORY_GENERATION_KEY)
+
+def invalidate_directory():
+    bump_generation(DIRECTORY_GENERATION_KEY)
+
+def cached_directory(name, loader, timeout=300):
+    try:
+        key = f'directory:{directory_generation()}:{name}'
+    except Exception as e:
+        print(f"Directory cache unavailable: {e}")
+        return loader()
+    return cached_value(key, loader, timeout)
+
+def slot_generation_key(doctor_id, day):
+    return f'slots:generation:{doctor_id}:{day.isoformat()}'
+
+def slot_generation(doctor_id, day):
+    key = slot_generation_key(doctor_id, day)
+    value = local_slot_generations.get(key)
+    if value is None:
+        value = generation(key, SLOT_GENERATION_TIMEOUT)
+        local_slot_generations.set(key, value)
+    return value
+
+def cached_day_slots(doctor_id, day, loader):
+    try:
+        key = f'slots:{doctor_id}:{day.isoformat()}:{slot_generation(doctor_id, day)}'
+    except Exception as e:
+        print(f"Slot cache unavailable: {e}")
+        return loader()
+    value = local_slots.get(key)
+    if value is not None:
+        count_cache('local_hits')
+        return value
+    value = cached_value(key, loader, SLOT_CACHE_TIMEOUT)
+    local_slots.set(key, value)
+    return value
+
+def invalidate_doctor_day(doctor_id, day):
+    key = slot_generation_key(doctor_id, day)
+    bump_generation(key, SLOT_GENERATION_TIMEOUT)
+    local_slot_generations.delete(key)
+
+def availability_generation_key(doctor_id):
+    return f'availability:generation:{doctor_id}'
+
+def cached_doctor_availability(doctor_id, start_date, end_date, loader):
+    try:
+        key = f'availability:{doctor_id}:{generation(availability_generation_key(doctor_id))}:{start_date or ""}:{end_date or ""}'
+    except Exception as e:
+        print(f"Availability cache unavailable: {e}")
+        return loader()
+    return cached_value(key, loader, SLOT_CACHE_TIMEOUT)
+
+def invalidate_doctor_availability(doctor_id, days):
+    bump_generation(availability_generation_key(doctor_id))
+    for day in days:
+        invalidate_doctor_day(doctor_id, day)
+
+def cache_stats():
+    cache = get_cache()
+    return {
+        'hits': int(cache.get('cache:stats:hits') or 0),
+        'misses': int(cache.get('cache:stats:misses') or 0),
+        'local_hits': local_slots.hits,
+        'directory_generation': directory_generation(),
+    }
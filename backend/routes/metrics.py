@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from flask import current_app, g, has_request_context, request
+from models.engine import env_bool, env_int
+
+METRICS_ENABLED = env_bool('METRICS_ENABLED', 'false')
+PROFILE_THRESHOLD_MS = env_int('METRICS_PROFILE_THRESHOLD_MS', 0)
+PROFILE_INTERVAL_MS = env_int('METRICS_PROFILE_INTERVAL_MS', 5)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_bucket{{{labels},le="+Inf"}} {self.count}'
+        yield f'{name}_sum{{{labels}}} {round(self.total, 6)}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+class RequestMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.sql_per_request = defaultdict(lambda: Histogram(SQL_COUNT_BUCKETS))
+        self.requests = Counter()
+        self.sql_statements = Counter()
+        self.sql_seconds = Counter()
+        self.cache = Counter()
+        self.profiles = 0
+
+    def observe(self, endpoint, status, seconds, sql_count, sql_seconds, cache_outcomes):
+        with self.lock:
+            self.latency[endpoint].observe(seconds)
+            self.sql_per_request[endpoint].observe(sql_count)
+            self.requests[(endpoint, status)] += 1
+            self.sql_statements[endpoint] += sql_count
+            self.sql_seconds[endpoint] += sql_seconds
+            for outcome, count in cache_outcomes.items():
+                self.cache[(endpoint, outcome)] += count
+
+    def render(self):
+        out = []
+        with self.lock:
+            out += ['# HELP hms_request_duration_seconds Request latency by endpoint', '# TYPE hms_request_duration_seconds histogram']
+            for endpoint, histogram in sorted(self.latency.items()):
+                out += histogram.lines('hms_request_duration_seconds', f'endpoint="{endpoint}"')
+            out += ['# HELP hms_request_sql_statements SQL statements per request', '# TYPE hms_request_sql_statements histogram']
+            for endpoint, histogram in sorted(self.sql_per_request.items()):
+                out += histogram.lines('hms_request_sql_statements', f'endpoint="{endpoint}"')
+            out += ['# HELP hms_requests_total Requests by endpoint and status', '# TYPE hms_requests_total counter']
+            out += [f'hms_requests_total{{endpoint="{e}",status="{s}"}} {n}' for (e, s), n in sorted(self.requests.items())]
+            out += ['# HELP hms_sql_statements_total SQL statements by endpoint', '# TYPE hms_sql_statements_total counter']
+            out += [f'hms_sql_statements_total{{endpoint="{e}"}} {n}' for e, n in sorted(self.sql_statements.items())]
+            out += ['# HELP hms_sql_seconds_total Time spent in SQL by endpoint', '# TYPE hms_sql_seconds_total counter']
+            out += [f'hms_sql_seconds_total{{endpoint="{e}"}} {round(n, 6)}' for e, n in sorted(self.sql_seconds.items())]
+            out += ['# HELP hms_cache_requests_total Cache lookups by endpoint and outcome', '# TYPE hms_cache_requests_total counter']
+            out += [f'hms_cache_requests_total{{endpoint="{e}",outcome="{o}"}} {n}' for (e, o), n in sorted(self.cache.items())]
+            out += ['# HELP hms_profiles_written_total Slow request profiles written', '# TYPE hms_profiles_written_total counter']
+            out.append(f'hms_profiles_written_total {self.profiles}')
+        return '\n'.join(out) + '\n'
+
+class SamplingProfiler:
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = {}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.stacks[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name='request-profiler', daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.stacks.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, stacks in self.stacks.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[folded_stack(frame)] += 1
+
+def folded_stack(frame):
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def write_profile(app, endpoint, seconds, stacks):
+    path = os.path.join(app.instance_path, 'profiles')
+    os.makedirs(path, exist_ok=True)
+    filename = os.path.join(path, f"{time.strftime('%Y%m%d-%H%M%S')}-{endpoint}-{int(seconds * 1000)}ms.folded")
+    with open(filename, 'w') as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return filename
+
+metrics = RequestMetrics()
+profiler = SamplingProfiler(PROFILE_INTERVAL_MS / 1000)
+
+def count_cache(outcome):
+    if METRICS_ENABLED and has_request_context() and 'metrics_cache' in g:
+        g.metrics_cache[outcome] += 1
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_query_start'] = time.perf_counter()
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'metrics_sql' in g:
+        g.metrics_sql[0] += 1
+        g.metrics_sql[1] += time.perf_counter() - conn.info.pop('metrics_query_start', time.perf_counter())
+
+def install_metrics(blueprint):
+    if not METRICS_ENABLED:
+        return
+
+    @blueprint.record_once
+    def listen_sql(state):
+        from sqlalchemy import event
+        from models.database import db
+        with state.app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', after_cursor_execute)
+
+    @blueprint.before_request
+    def start_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql = [0, 0.0]
+        g.metrics_cache = Counter()
+        if PROFILE_THRESHOLD_MS:
+            profiler.start(threading.get_ident())
+
+    @blueprint.after_request
+    def finish_metrics(response):
+        if 'metrics_start' not in g:
+            return response
+        seconds = time.perf_counter() - g.metrics_start
+        endpoint = request.endpoint or 'unmatched'
+        metrics.observe(endpoint, response.status_code, seconds, g.metrics_sql[0], g.metrics_sql[1], g.metrics_cache)
+        if PROFILE_THRESHOLD_MS:
+            stacks = profiler.stop(threading.get_ident())
+            if seconds * 1000 >= PROFILE_THRESHOLD_MS and stacks:
+                try:
+                    write_profile(current_app, endpoint, seconds, stacks)
+                    with metrics.lock:
+                        metrics.profiles += 1
+                except Exception as e:
+                    print(f"Profile write failed: {e}")
+        return response
+
+    @blueprint.teardown_request
+    def stop_profiler(exc):
+        if PROFILE_THRESHOLD_MS:
+            profiler.stop(threading.get_ident())
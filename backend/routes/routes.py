@@ -1,11 +1,24 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify, session, current_app, send_file, url_for
 from functools import wraps
-from datetime import datetime, date
-from celery.result import AsyncResult
+from datetime import datetime, date, timedelta
 from sqlalchemy.exc import IntegrityError
-from models.database import db, Patient, Doctor, Appointment, Department, Treatment, DoctorAvailability
+from itsdangerous import BadSignature
+from models.database import db, Patient, Doctor, Appointment, Department, Treatment, DoctorAvailability, DashboardCounters
+from routes.caching import cached_directory, invalidate_directory, cache_stats, cached_day_slots, cached_doctor_availability, invalidate_doctor_day, invalidate_doctor_availability
+from models.availability import parse_slot_ranges, expand_weekly_template, sync_doctor_availability, InvalidTimeRange, MAX_TEMPLATE_DAYS
+from models.slots import day_free_slots, format_slots, slot_status, claim_slot, search_free_slots, SLOT_MINUTES
+from models.notifications import enqueue_notification, discard_notifications
+from models.queries import appointments_with_relations, doctors_with_department, appointment_page, decode_cursor, appointment_counts, refresh_dashboard_counters, find_credentials
+from models.passwords import verify_password, needs_rehash, hash_password_pooled, HashingBusy
+from models.search import search, SEARCH_KINDS, MIN_TERM_LENGTH
+from routes.metrics import install_metrics, metrics, METRICS_ENABLED
 
 routes = Blueprint('routes', __name__)
+install_metrics(routes)
+
+@routes.errorhandler(HashingBusy)
+def hashing_busy(e):
+    return jsonify({'error': 'Server is busy, please try again shortly'}), 503, {'Retry-After': '1'}
 
 def login_required(f):
     @wraps(f)
@@ -33,6 +46,17 @@ def doctor_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def appointment_page_args():
+    args = request.args
+    limit = max(1, min(args.get('limit', 50, type=int), 200))
+    return {
+        'limit': limit,
+        'cursor': decode_cursor(args['cursor']) if args.get('cursor') else None,
+        'status': args.get('status'),
+        'date_from': datetime.strptime(args['from'], '%Y-%m-%d').date() if args.get('from') else None,
+        'date_to': datetime.strptime(args['to'], '%Y-%m-%d').date() if args.get('to') else None,
+    }
+
 @routes.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -51,9 +75,10 @@ def register():
         address=data.get('address'),
         created_at=datetime.utcnow()
     )
-    patient.set_password(data['password'])
+    patient.password_hash = hash_password_pooled(data['password'])
     
     db.session.add(patient)
+    DashboardCounters.bump(total_patients=1)
     db.session.commit()
     
     return jsonify({
@@ -69,26 +94,33 @@ def login():
     if not username or not password:
         return jsonify({'error': 'Username and password required'}), 400
 
-    user = Patient.query.filter_by(username=username).first()
-    if user and user.check_password(password):
-        session.clear()
-        session['user_id'] = user.id
-        session['is_admin'] = user.is_admin
-        return jsonify({
-            'message': 'Login successful',
-            'role': 'admin' if user.is_admin else 'patient',
-            'user_id': user.id,
-            'name': user.full_name
-        })
-    doctor = Doctor.query.filter_by(username=username).first()
-    if doctor and doctor.check_password(password):
+    for role, account_id, password_hash, is_admin, name in find_credentials(username):
+        if not verify_password(password_hash, password):
+            continue
+        if needs_rehash(password_hash):
+            try:
+                model = Doctor if role == 'doctor' else Patient
+                model.query.filter_by(id=account_id).update({'password_hash': hash_password_pooled(password)})
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Password rehash failed for {role} {account_id}: {e}")
         session.clear()
-        session['doctor_id'] = doctor.id
+        if role == 'doctor':
+            session['doctor_id'] = account_id
+            return jsonify({
+                'message': 'Login successful',
+                'role': 'doctor',
+                'doctor_id': account_id,
+                'name': name
+            })
+        session['user_id'] = account_id
+        session['is_admin'] = is_admin
         return jsonify({
             'message': 'Login successful',
-            'role': 'doctor',
-            'doctor_id': doctor.id,
-            'name': doctor.name
+            'role': 'admin' if is_admin else 'patient',
+            'user_id': account_id,
+            'name': name
         })
     return jsonify({'error': 'Invalid username or password'}), 401
 
@@ -100,11 +132,12 @@ def logout():
 @routes.route('/admin/dashboard', methods=['GET'])
 @admin_required
 def admin_dashboard():
+    counters = db.session.get(DashboardCounters, 1) or refresh_dashboard_counters()
     stats = {
-        'total_patients': Patient.query.filter_by(is_admin=False).count(),
-        'total_doctors': Doctor.query.count(),
-        'total_appointments': Appointment.query.count(),
-        'pending_appointments': Appointment.query.filter_by(status='booked').count(),
+        'total_patients': counters.total_patients,
+        'total_doctors': counters.total_doctors,
+        'total_appointments': counters.total_appointments,
+        'pending_appointments': counters.pending_appointments,
     }
     recent_patients = [
         {'id': p.id, 'name': p.full_name, 'email': p.email, 'phone': p.phone, 'created_at': p.created_at.isoformat() if p.created_at else None}
@@ -112,14 +145,14 @@ def admin_dashboard():
     ]
     recent_doctors = [
         {'id': d.id, 'name': d.name, 'department': d.department.name if d.department else None, 'qualification': d.qualification, 'experience_years': d.experience_years,'email': d.email, 'phone': d.phone}
-        for d in Doctor.query.order_by(Doctor.created_at.desc()).limit(5)
+        for d in doctors_with_department().order_by(Doctor.created_at.desc()).limit(5)
     ]
     recent_appointments = [
         {'id': a.id, 'patient_id': a.patient.id, 'patient': a.patient.full_name, 'doctor': a.doctor.name,
         'department': a.doctor.department.name if a.doctor.department else None,'date': a.date.strftime('%Y-%m-%d'),
         'time': a.time.strftime('%H:%M'),'status': a.status
         }
-        for a in Appointment.query.order_by(Appointment.date.desc()).limit(10)
+        for a in appointments_with_relations().order_by(Appointment.date.desc()).limit(10)
     ]
     return jsonify({
         'stats': stats,
@@ -131,18 +164,61 @@ def admin_dashboard():
 @routes.route('/admin/doctors', methods=['GET'])
 @admin_required
 def get_all_doctors():
-    doctors = Doctor.query.all()
-    return jsonify([
-        {
-            'id': d.id,
-            'name': d.name,
-            'department': d.department.name if d.department else None,
-            'qualification': d.qualification,
-            'experience_years': d.experience_years,
-            'email': d.email
-        }
-        for d in doctors
-    ])
+    def load_doctors():
+        return [
+            {
+                'id': d.id,
+                'name': d.name,
+                'department': d.department.name if d.department else None,
+                'qualification': d.qualification,
+                'experience_years': d.experience_years,
+                'email': d.email
+            }
+            for d in doctors_with_department().all()
+        ]
+    return jsonify(cached_directory('admin_doctors', load_doctors))
+
+@routes.route('/admin/search', methods=['GET'])
+@admin_required
+def admin_search():
+    query = request.args.get('q', '')
+    kinds = [kind for kind in request.args.get('type', ','.join(SEARCH_KINDS)).split(',') if kind]
+    if not kinds or any(kind not in SEARCH_KINDS for kind in kinds):
+        return jsonify({'error': f"type must be a comma-separated list of {', '.join(SEARCH_KINDS)}"}), 400
+    limit = max(1, min(request.args.get('limit', 20, type=int), 100))
+    page = max(1, request.args.get('page', 1, type=int))
+    found = search(query, kinds, limit, (page - 1) * limit)
+    if found is None:
+        return jsonify({'error': f'Search needs at least one term of {MIN_TERM_LENGTH} or more characters'}), 400
+    results, has_more = found
+    return jsonify({
+        'query': query,
+        'page': page,
+        'limit': limit,
+        'next_page': page + 1 if has_more else None,
+        'results': results
+    })
+
+@routes.route('/admin/cache-stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    return jsonify(cache_stats())
+
+@routes.route('/admin/task-metrics', methods=['GET'])
+@admin_required
+def get_task_metrics():
+    from app import celery
+    from tasks.celery_tasks import celery as task_app
+    from tasks.metrics import task_metrics, queue_depth
+    names = sorted(name for name in task_app.tasks if name.startswith('tasks.'))
+    return jsonify({'queue_depth': queue_depth(celery), 'tasks': task_metrics(names)})
+
+@routes.route('/admin/metrics', methods=['GET'])
+@admin_required
+def get_metrics():
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled, set METRICS_ENABLED=true'}), 404
+    return current_app.response_class(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @routes.route('/admin/doctor', methods=['POST'])
 @admin_required
@@ -170,9 +246,11 @@ def add_doctor():
         department_id=data['department_id'],
         created_at=datetime.utcnow()
     )
-    doctor.set_password(data['password'])
+    doctor.password_hash = hash_password_pooled(data['password'])
     db.session.add(doctor)
+    DashboardCounters.bump(total_doctors=1)
     db.session.commit()
+    invalidate_directory()
     return jsonify({
         'message': 'Doctor added successfully!',
         'doctor_id': doctor.id
@@ -197,6 +275,7 @@ def update_doctor(doctor_id):
     doctor.experience_years = data.get('experience_years', doctor.experience_years)
     try:
         db.session.commit()
+        invalidate_directory()
         return jsonify({'message': 'Doctor profile updated successfully!'}), 200
     except Exception as e:
         db.session.rollback()
@@ -208,14 +287,19 @@ def update_doctor(doctor_id):
 def doctor_dashboard(doctor_id):
     if session.get('doctor_id') != doctor_id:
         return jsonify({'error': 'Unauthorized'}), 403
-    doctor = Doctor.query.get_or_404(doctor_id)
+    doctor = doctors_with_department().get_or_404(doctor_id)
+    try:
+        page, next_cursor = appointment_page(appointments_with_relations().filter(Appointment.doctor_id == doctor_id), **appointment_page_args())
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination or filter parameter: {str(e)}'}), 400
     appointments = [
         {'id': a.id, 'patient': a.patient.full_name,'patient_id': a.patient_id,'date': a.date.strftime('%Y-%m-%d'),'time': a.time.strftime('%H:%M'),'status': a.status,'reason': a.reason}
-        for a in sorted(doctor.appointments, key=lambda x: x.date, reverse=True)
+        for a in page
     ]
     return jsonify({
         'doctor': {'id': doctor.id,'name': doctor.name,'department': doctor.department.name if doctor.department else None, 'email': doctor.email},
-        'appointments': appointments
+        'appointments': appointments,
+        'next_cursor': next_cursor
     })
 
 @routes.route('/appointment/<int:appointment_id>/treatment', methods=['POST'])
@@ -235,9 +319,12 @@ def add_treatment(appointment_id):
     if data.get('follow_up_date'):
         treatment.follow_up_date = datetime.strptime(data['follow_up_date'], '%Y-%m-%d').date()
     
+    if appointment.status == 'booked':
+        DashboardCounters.bump(pending_appointments=-1)
     appointment.status = 'completed'
     db.session.add(treatment)
     db.session.commit()
+    invalidate_doctor_day(appointment.doctor_id, appointment.date)
     return jsonify({
         'message': 'Treatment added successfully',
         'treatment_id': treatment.id
@@ -250,16 +337,21 @@ def patient_dashboard(patient_id):
         return jsonify({'error': 'Unauthorized'}), 403
     
     patient = Patient.query.get_or_404(patient_id)
+    try:
+        page, next_cursor = appointment_page(appointments_with_relations().filter(Appointment.patient_id == patient_id), **appointment_page_args())
+    except ValueError as e:
+        return jsonify({'error': f'Invalid pagination or filter parameter: {str(e)}'}), 400
     appointments = [
         {'id': a.id,'doctor': a.doctor.name,'doctor_id': a.doctor_id,
         'department': a.doctor.department.name if a.doctor.department else None,
         'date': a.date.strftime('%Y-%m-%d'),'time': a.time.strftime('%H:%M'),'status': a.status,'reason': a.reason
         }
-        for a in sorted(patient.appointments, key=lambda a: a.date, reverse=True)
+        for a in page
     ]
     return jsonify({
         'patient': {'id': patient.id, 'name': patient.full_name,'email': patient.email,'phone': patient.phone,'age': patient.age,'gender': patient.gender},
-        'appointments': appointments
+        'appointments': appointments,
+        'next_cursor': next_cursor
     })
 
 @routes.route('/patient/<int:patient_id>', methods=['PUT'])
@@ -289,7 +381,7 @@ def patient_history(patient_id):
         return jsonify({'error': 'Unauthorized access'}), 403
 
     patient = Patient.query.get_or_404(patient_id)
-    appointments = (Appointment.query.filter_by(patient_id=patient_id).order_by(Appointment.date.desc()).all())
+    appointments = appointments_with_relations().filter(Appointment.patient_id == patient_id).order_by(Appointment.date.desc()).all()
     history = []
     for appointment in appointments:
         treatment = appointment.treatment
@@ -330,37 +422,23 @@ def book_appointment():
             return jsonify({'error': 'Cannot book appointments in the past'}), 400
         if appointment_date == today and appointment_time <= now:
             return jsonify({'error': 'Cannot book appointments for past times'}), 400
-        availability = DoctorAvailability.query.filter(
-            DoctorAvailability.doctor_id == data['doctor_id'],
-            DoctorAvailability.date == appointment_date,
-            DoctorAvailability.is_enabled == True,
-            DoctorAvailability.start_time <= appointment_time,
-            DoctorAvailability.end_time > appointment_time
-        ).first()
-    
-        if not availability:
+        status = slot_status(data['doctor_id'], appointment_date, appointment_time)
+        if status == 'unavailable':
             return jsonify({'error': 'Selected time slot is not available'}), 400
-        existing = Appointment.query.filter_by(doctor_id=data['doctor_id'],date=appointment_date,time=appointment_time).filter(Appointment.status.in_(['booked', 'confirmed'])).first()
-        if existing:
+        if status == 'booked':
             return jsonify({'error': 'This time slot is already booked'}), 409
         
-        appointment = Appointment(
-            patient_id=patient_id,
-            doctor_id=data['doctor_id'],
-            date=appointment_date,
-            time=appointment_time,
-            reason=data.get('reason'),
-            status='booked',
-            created_at=datetime.utcnow()
-        )
-        db.session.add(appointment)
+        appointment_id = claim_slot(patient_id, data['doctor_id'], appointment_date, appointment_time, data.get('reason'))
+        if not appointment_id:
+            db.session.rollback()
+            return jsonify({'error': 'This time slot was just booked by another patient. Please select another time.'}), 409
+        enqueue_notification(appointment_id, 'confirmed')
+        DashboardCounters.bump(total_appointments=1, pending_appointments=1)
         db.session.commit()
-
-        from app import celery
-        celery.send_task('tasks.send_appointment_confirmed', args=[appointment.id])
+        invalidate_doctor_day(data['doctor_id'], appointment_date)
         return jsonify({
             'message': 'Appointment booked successfully',
-            'appointment_id': appointment.id
+            'appointment_id': appointment_id
         }), 201
         
     except IntegrityError:
@@ -380,14 +458,21 @@ def cancel_appointment(appointment_id):
         session.get('doctor_id') != appointment.doctor_id and
         not session.get('is_admin')):
         return jsonify({'error': 'Unauthorized'}), 403
+    if appointment.status == 'cancelled':
+        return jsonify({'message': 'Appointment already cancelled', 'duplicate': True})
     data = request.get_json(silent=True) or {}
     reason = data.get('reason')
+    if appointment.status == 'booked':
+        DashboardCounters.bump(pending_appointments=-1)
     appointment.status = 'cancelled'
-    db.session.commit()
-
-    from app import celery
-    celery.send_task('tasks.send_appointment_cancelled', args=[appointment_id, reason])
-    return jsonify({'message': 'Appointment cancelled successfully'})
+    enqueue_notification(appointment_id, 'cancelled', {'reason': reason})
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'message': 'Appointment already cancelled', 'duplicate': True})
+    invalidate_doctor_day(appointment.doctor_id, appointment.date)
+    return jsonify({'message': 'Appointment cancelled successfully', 'duplicate': False})
 
 @routes.route('/appointment/<int:appointment_id>/details', methods=['GET'])
 @login_required
@@ -395,7 +480,7 @@ def get_appointment_details(appointment_id):
     user_id = session.get('user_id')
     is_admin = session.get('is_admin', False)
     doctor_id = session.get('doctor_id')
-    appointment = Appointment.query.get_or_404(appointment_id)
+    appointment = appointments_with_relations().get_or_404(appointment_id)
     if not (is_admin or doctor_id or appointment.patient_id == user_id):
         return jsonify({'error': 'Unauthorized access'}), 403
 
@@ -421,23 +506,54 @@ def get_appointment_details(appointment_id):
 
 @routes.route('/departments', methods=['GET'])
 def get_departments():
-    from app import cache
-    @cache.cached(timeout=300, key_prefix='all_departments')
     def get_all_departments():
         departments = Department.query.all()
         return [
             {'id': d.id,'name': d.name,'description': d.description}
             for d in departments
         ]
-    return jsonify(get_all_departments())
+    return jsonify(cached_directory('departments', get_all_departments))
 
 @routes.route('/departments/<int:department_id>/doctors', methods=['GET'])
 def get_department_doctors(department_id):
-    doctors = Doctor.query.filter_by(department_id=department_id).all()
-    return jsonify([
-        {'id': d.id,'name': d.name,'qualification': d.qualification,'experience_years': d.experience_years,'email': d.email,'phone': d.phone}
-        for d in doctors
-    ])
+    def get_doctors():
+        doctors = Doctor.query.filter_by(department_id=department_id).all()
+        return [
+            {'id': d.id,'name': d.name,'qualification': d.qualification,'experience_years': d.experience_years,'email': d.email,'phone': d.phone}
+            for d in doctors
+        ]
+    return jsonify(cached_directory(f'department_doctors:{department_id}', get_doctors))
+
+def slot_search_response(department_id=None):
+    try:
+        today = date.today()
+        date_from = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else today
+        date_to = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else date_from + timedelta(days=6)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
+    if date_to < date_from:
+        return jsonify({'error': 'from must be on or before to'}), 400
+    if (date_to - date_from).days > 31:
+        return jsonify({'error': 'Date range cannot exceed 31 days'}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    date_from = max(date_from, today)
+    if date_to < date_from:
+        return jsonify({'from': date_from.isoformat(), 'to': date_to.isoformat(), 'slot_minutes': SLOT_MINUTES, 'slots': []}), 200
+    slots = search_free_slots(date_from, date_to, department_id=department_id, now=datetime.now(), limit=limit)
+    return jsonify({'from': date_from.isoformat(), 'to': date_to.isoformat(), 'slot_minutes': SLOT_MINUTES, 'slots': slots}), 200
+
+@routes.route('/departments/<int:department_id>/available-slots', methods=['GET'])
+def get_department_available_slots(department_id):
+    return slot_search_response(department_id)
+
+@routes.route('/available-slots', methods=['GET'])
+def search_available_slots():
+    department_id = request.args.get('department_id', type=int)
+    return slot_search_response(department_id)
+
+def export_download_url(task_id):
+    from tasks.exports import export_token
+    return url_for('routes.download_export', task_id=task_id, token=export_token(current_app, task_id, session.get('user_id')))
 
 @routes.route('/export-patient/<int:patient_id>', methods=['POST'])
 @login_required
@@ -448,14 +564,75 @@ def start_export(patient_id):
     
     from app import celery
     task = celery.send_task('tasks.export_patient_treatments', args=[patient_id])
-    return jsonify({'message': 'Export started','task_id': task.id,'patient_name': patient.full_name}), 202
+    return jsonify({'message': 'Export started','task_id': task.id,'patient_name': patient.full_name,'download_url': export_download_url(task.id)}), 202
+
+@routes.route('/export-department/<int:department_id>', methods=['POST'])
+@admin_required
+def start_department_export(department_id):
+    department = Department.query.get_or_404(department_id)
+
+    from app import celery
+    task = celery.send_task('tasks.export_department_treatments', args=[department_id])
+    return jsonify({'message': 'Export started','task_id': task.id,'department': department.name,'download_url': export_download_url(task.id)}), 202
+
+@routes.route('/admin/export', methods=['POST'])
+@admin_required
+def start_bulk_export():
+    from tasks.exports import EXPORT_FORMATS, MAX_PARTITIONS
+    data = request.get_json(silent=True) or {}
+    fmt = data.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    filters = {}
+    try:
+        for key in ('from', 'to'):
+            if data.get(key):
+                datetime.strptime(data[key], '%Y-%m-%d')
+                filters[key] = data[key]
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
+    if data.get('department_id'):
+        filters['department_id'] = Department.query.get_or_404(data['department_id']).id
+    try:
+        partitions = int(data.get('partitions', 8))
+    except (TypeError, ValueError):
+        return jsonify({'error': f'partitions must be an integer between 1 and {MAX_PARTITIONS}'}), 400
+    partitions = max(1, min(partitions, MAX_PARTITIONS))
+
+    from app import celery
+    task = celery.send_task('tasks.bulk_export', args=[filters, fmt, partitions])
+    return jsonify({'message': 'Export started','task_id': task.id,'download_url': export_download_url(task.id)}), 202
+
+@routes.route('/export/<task_id>/download', methods=['GET'])
+@login_required
+def download_export(task_id):
+    from tasks.exports import find_export, export_serializer, EXPORT_LINK_MAX_AGE
+    try:
+        data = export_serializer(current_app).loads(request.args.get('token', ''), max_age=EXPORT_LINK_MAX_AGE)
+    except BadSignature:
+        return jsonify({'error': 'Invalid or expired download link'}), 403
+    if data.get('task_id') != task_id or data.get('user_id') is None or data.get('user_id') != session.get('user_id'):
+        return jsonify({'error': 'Invalid or expired download link'}), 403
+    path, mimetype, ext = find_export(current_app, task_id)
+    if not path:
+        return jsonify({'error': 'Export is not ready yet'}), 404
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=f'export_{task_id}{ext}')
 
 @routes.route('/task-status/<task_id>', methods=['GET'])
 @login_required
 def task_status(task_id):
     from app import celery
-    result = AsyncResult(task_id, app=celery)
+    from celery.result import AsyncResult
+    from tasks.exports import export_progress
+    result = AsyncResult(task_id, app=celery._get_current_object())
     response = {'task_id': task_id,'state': result.state,'status': result.status}
+    try:
+        progress = export_progress(task_id)
+    except Exception as e:
+        print(f"Export progress unavailable for {task_id}: {e}")
+        progress = None
+    if progress:
+        response['progress'] = progress
     if result.state == 'SUCCESS':
         response['result'] = str(result.result)
     elif result.state == 'FAILURE':
@@ -466,43 +643,60 @@ def task_status(task_id):
         response['message'] = f'Task is {result.state}'
     return jsonify(response)
 
+def queue_notification(appointment_id, event, payload=None):
+    if not enqueue_notification(appointment_id, event, payload):
+        return None
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return None
+    return True
+
 @routes.route('/appointment/<int:appointment_id>/notify-confirmed', methods=['POST'])
 @login_required
 def notify_appointment_confirmed(appointment_id):
-    from app import celery
     appointment = Appointment.query.get_or_404(appointment_id)
 
     if (session.get('user_id') != appointment.patient_id and not session.get('is_admin')):
         return jsonify({'error': 'Unauthorized'}), 403
-    task = celery.send_task('tasks.send_appointment_confirmed', args=[appointment_id])
-    return jsonify({'message': 'Confirmation notification sent','task_id': task.id})
+    if not queue_notification(appointment_id, 'confirmed'):
+        return jsonify({'message': 'Confirmation notification already queued', 'duplicate': True})
+    return jsonify({'message': 'Confirmation notification queued', 'duplicate': False})
 
 @routes.route('/appointment/<int:appointment_id>/notify-cancelled', methods=['POST'])
 @login_required
 def notify_appointment_cancelled(appointment_id):
-    from app import celery
     appointment = Appointment.query.get_or_404(appointment_id)
-    data = request.get_json() or {}
+    data = request.get_json(silent=True) or {}
     reason = data.get('reason')
     if (session.get('user_id') != appointment.patient_id and not session.get('is_admin')):
         return jsonify({'error': 'Unauthorized'}), 403
     
-    task = celery.send_task('tasks.send_appointment_cancelled', args=[appointment_id, reason])
-    return jsonify({'message': 'Cancellation notification sent','task_id': task.id})
+    if not queue_notification(appointment_id, 'cancelled', {'reason': reason}):
+        return jsonify({'message': 'Cancellation notification already queued', 'duplicate': True})
+    return jsonify({'message': 'Cancellation notification queued', 'duplicate': False})
 
 @routes.route('/admin/doctor/<int:doctor_id>', methods=['DELETE'])
 @admin_required
 def delete_doctor(doctor_id):
     doctor = Doctor.query.get_or_404(doctor_id)
+    total, pending = appointment_counts(Appointment.doctor_id == doctor_id)
+    discard_notifications(Appointment.doctor_id == doctor_id)
     db.session.delete(doctor)
+    DashboardCounters.bump(total_doctors=-1, total_appointments=-total, pending_appointments=-pending)
     db.session.commit()
+    invalidate_directory()
     return jsonify({'message': 'Doctor removed successfully'})
 
 @routes.route('/admin/patient/<int:patient_id>', methods=['DELETE'])
 @admin_required
 def delete_patient(patient_id):
     patient = Patient.query.get_or_404(patient_id)
+    total, pending = appointment_counts(Appointment.patient_id == patient_id)
+    discard_notifications(Appointment.patient_id == patient_id)
     db.session.delete(patient)
+    DashboardCounters.bump(total_patients=0 if patient.is_admin else -1, total_appointments=-total, pending_appointments=-pending)
     db.session.commit()
     return jsonify({'message': 'Patient removed successfully'})
 
@@ -514,27 +708,39 @@ def save_doctor_availability(doctor_id):
     
     try:
         data = request.get_json()
-        doctor = Doctor.query.get_or_404(doctor_id)
+        Doctor.query.get_or_404(doctor_id)
         today = date.today()
-        for day in data:
+        days = data if isinstance(data, list) else data.get('days', [])
+        template = None if isinstance(data, list) else data.get('template')
+        desired = {}
+        if template:
+            missing = [key for key in ('from', 'to') if not template.get(key)]
+            if missing:
+                return jsonify({'error': f'Template is missing required field: {", ".join(missing)}'}), 400
+            template_from = datetime.strptime(template['from'], '%Y-%m-%d').date()
+            template_to = datetime.strptime(template['to'], '%Y-%m-%d').date()
+            if template_from < today:
+                return jsonify({'error': f'Cannot set availability for past date: {template["from"]}'}), 400
+            if template_to < template_from or (template_to - template_from).days >= MAX_TEMPLATE_DAYS:
+                return jsonify({'error': f'Template range must run forward and cover at most {MAX_TEMPLATE_DAYS} days'}), 400
+            weekdays = {int(weekday): parse_slot_ranges(slots, f'weekday {weekday}') for weekday, slots in template.get('weekdays', {}).items()}
+            desired.update(expand_weekly_template(template_from, template_to, weekdays))
+        for day in days:
             day_date = datetime.strptime(day['date'], '%Y-%m-%d').date()
             if day_date < today:
                 return jsonify({'error': f'Cannot set availability for past date: {day["date"]}'}), 400
-            
-            DoctorAvailability.query.filter(DoctorAvailability.doctor_id == doctor_id,DoctorAvailability.date == day_date).delete(synchronize_session=False)
-            if day['enabled']:
-                for slot in day['slots']:
-                    if not slot['start'] or not slot['end']:
-                        continue
-                    start_time = datetime.strptime(slot['start'], '%H:%M').time()
-                    end_time = datetime.strptime(slot['end'], '%H:%M').time()
-                    if start_time >= end_time:
-                        return jsonify({'error': f'Invalid time range on {day["date"]}: start time must be before end time'}), 400
-                    availability = DoctorAvailability(doctor_id=doctor_id, date=day_date, start_time=start_time, end_time=end_time, is_enabled=True)
-                    db.session.add(availability)
-                    db.session.commit()
-        return jsonify({'message': 'Availability saved successfully'}), 200
+            desired[day_date] = parse_slot_ranges(day['slots'], day['date']) if day['enabled'] else set()
+
+        result = sync_doctor_availability(doctor_id, desired)
+        invalidate_doctor_availability(doctor_id, result['changed_dates'])
+        return jsonify({'message': 'Availability saved successfully', 'inserted': result['inserted'], 'deleted': result['deleted']}), 200
         
+    except InvalidTimeRange as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        db.session.rollback()
+        return jsonify({'error': f'Missing required field: {e.args[0]}'}), 400
     except ValueError as e:
         db.session.rollback()
         return jsonify({'error': f'Invalid date or time format: {str(e)}'}), 400
@@ -547,19 +753,24 @@ def get_doctor_availability(doctor_id):
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
-        query = DoctorAvailability.query.filter_by(doctor_id=doctor_id, is_enabled=True)
-        if start_date:
-            query = query.filter(DoctorAvailability.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
-        if end_date:
-            query = query.filter(DoctorAvailability.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
-        slots = query.order_by(DoctorAvailability.date, DoctorAvailability.start_time).all()
-        availability_by_date = {}
-        for slot in slots:
-            date_str = slot.date.strftime('%Y-%m-%d')
-            if date_str not in availability_by_date:
-                availability_by_date[date_str] = {'date': date_str,'enabled': True,'slots': []}
-            availability_by_date[date_str]['slots'].append({'start': slot.start_time.strftime('%H:%M'),'end': slot.end_time.strftime('%H:%M')})
-        return jsonify(list(availability_by_date.values())), 200
+        start = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+        end = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+
+        def load_availability():
+            query = DoctorAvailability.query.filter_by(doctor_id=doctor_id, is_enabled=True)
+            if start:
+                query = query.filter(DoctorAvailability.date >= start)
+            if end:
+                query = query.filter(DoctorAvailability.date <= end)
+            slots = query.order_by(DoctorAvailability.date, DoctorAvailability.start_time).all()
+            availability_by_date = {}
+            for slot in slots:
+                date_str = slot.date.strftime('%Y-%m-%d')
+                if date_str not in availability_by_date:
+                    availability_by_date[date_str] = {'date': date_str,'enabled': True,'slots': []}
+                availability_by_date[date_str]['slots'].append({'start': slot.start_time.strftime('%H:%M'),'end': slot.end_time.strftime('%H:%M')})
+            return list(availability_by_date.values())
+        return jsonify(cached_doctor_availability(doctor_id, start, end, load_availability)), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -573,20 +784,11 @@ def get_available_slots(doctor_id):
         query_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         today = date.today()
         if query_date < today:
-            return jsonify({'date': date_str,'slots': []}), 200
-        slots = DoctorAvailability.query.filter_by(doctor_id=doctor_id, date=query_date, is_enabled=True).order_by(DoctorAvailability.start_time).all()
-        booked_appointments = Appointment.query.filter_by(doctor_id=doctor_id,date=query_date).filter(Appointment.status.in_(['booked', 'confirmed'])).all()
-        booked_times = [apt.time.strftime('%H:%M') for apt in booked_appointments]
-        
-        current_time = None
-        if query_date == today:
-            current_time = datetime.now().time()
-        available = []
-        for slot in slots:
-            if current_time and slot.end_time <= current_time:
-                continue
-            available.append({'start': slot.start_time.strftime('%H:%M'),'end': slot.end_time.strftime('%H:%M'),'booked_times': booked_times,'current_time': current_time.strftime('%H:%M') if current_time else None})
-        return jsonify({'date': date_str,'slots': available}), 200
+            return jsonify({'date': date_str,'slot_minutes': SLOT_MINUTES,'slots': []}), 200
+        current_time = datetime.now().time() if query_date == today else None
+        free = cached_day_slots(doctor_id, query_date, lambda: day_free_slots(doctor_id, query_date))
+        slots = format_slots(free, current_time)
+        return jsonify({'date': date_str,'slot_minutes': SLOT_MINUTES,'slots': slots}), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -603,3 +805,28 @@ def send_appointment_record(appointment_id):
 
     task = celery.send_task('tasks.send_appointment_record_pdf', args=[appointment_id])
     return jsonify({'message': 'Medical record is being prepared and will be sent to your email shortly.','task_id': task.id}), 202
+
+@routes.route('/doctor/<int:doctor_id>/send-records', methods=['POST'])
+@doctor_required
+def send_doctor_records(doctor_id):
+    if session.get('doctor_id') != doctor_id:
+        return jsonify({'error': 'Unauthorized'}), 403
+    date_str = request.args.get('date')
+    if not date_str:
+        return jsonify({'error': 'Date parameter is required'}), 400
+    try:
+        record_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError as e:
+        return jsonify({'error': f'Invalid date format: {str(e)}'}), 400
+    appointment_ids = [a.id for a in db.session.query(Appointment.id).join(Patient, Patient.id == Appointment.patient_id).filter(
+        Appointment.doctor_id == doctor_id,
+        Appointment.date == record_date,
+        Appointment.status != 'cancelled',
+        Patient.email.isnot(None)
+    )]
+    if not appointment_ids:
+        return jsonify({'error': 'No appointments with patient email on this date'}), 404
+
+    from app import celery
+    task = celery.send_task('tasks.send_appointment_records_batch', args=[appointment_ids])
+    return jsonify({'message': f'{len(appointment_ids)} medical records are being prepared and sent.','task_id': task.id}), 202
@@ -1,52 +1,62 @@
-from celery import Celery
+from celery import Celery, chord, group
 from celery.schedules import crontab
+from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import io
-import csv
-import requests
-
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER
+from html import escape
+from itertools import groupby
+import os
+import json
+from tasks.mailer import mailer
+from tasks.metrics import MeteredTask
+from tasks.webhooks import deliver_many, send_webhooks
 
 def make_celery(app):
     celery = Celery(
         app.import_name,
         broker=app.config['CELERY_BROKER_URL'],
-        backend=app.config['CELERY_RESULT_BACKEND']
+        backend=app.config['CELERY_RESULT_BACKEND'],
+        task_cls=MeteredTask
     )
     celery.conf.update(app.config)
     class ContextTask(celery.Task):
         def __call__(self, *args, **kwargs):
             with app.app_context():
-                return self.run(*args, **kwargs)
+                return super().__call__(*args, **kwargs)
 
     celery.Task = ContextTask
     return celery
 
-celery = Celery('hospital_tasks')
+load_dotenv()
+
+celery = Celery(
+    'hospital_tasks',
+    broker=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
+    backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0'),
+    task_cls=MeteredTask
+)
+
+REMINDER_BATCH_SIZE = 100
+
+def chunked(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+WEBHOOK_REPLAY_BATCH_SIZE = 200
+WEBHOOK_MAX_REPLAYS = 10
 
 def send_gchat(webhook_url, text):
-    try:
-        response = requests.post(webhook_url, json={"text": text}, timeout=5)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"GChat send failed: {e}")
-        return False
+    return send_webhooks([(webhook_url, {"text": text})]) == 1
 
 @celery.task(name='tasks.send_appointment_confirmed', bind=True)
 def send_appointment_confirmed(self, appointment_id):
-    from app import app, mail
+    from app import app
     from models.database import Appointment
     from flask_mail import Message
     with app.app_context():
         a = Appointment.query.get(appointment_id)
         if not a:
             return "Appointment not found"
+        if a.status == 'cancelled':
+            return f"Appointment {appointment_id} was cancelled, confirmation skipped"
         patient = a.patient
         doctor = a.doctor
         body = (
@@ -60,17 +70,18 @@ def send_appointment_confirmed(self, appointment_id):
             try:
                 msg = Message("Appointment Confirmed", recipients=[patient.email])
                 msg.body = body
-                mail.send(msg)
+                mailer.send(msg)
+                self.count_items('emails')
             except Exception as e:
                 print(f"Email send failed: {e}")
         webhook = getattr(patient, 'gchat_webhook', None)
-        if webhook:
-            send_gchat(webhook, body)
+        if webhook and send_gchat(webhook, body):
+            self.count_items('chats')
         return f"Confirmation sent for appointment {appointment_id}"
 
 @celery.task(name='tasks.send_appointment_cancelled', bind=True)
 def send_appointment_cancelled(self, appointment_id, reason=None):
-    from app import app, mail
+    from app import app
     from models.database import Appointment
     from flask_mail import Message
     with app.app_context():
@@ -91,81 +102,80 @@ def send_appointment_cancelled(self, appointment_id, reason=None):
             try:
                 msg = Message("Appointment Cancelled", recipients=[patient.email])
                 msg.body = body
-                mail.send(msg)
+                mailer.send(msg)
+                self.count_items('emails')
             except Exception as e:
                 print(f"Email send failed: {e}")
         webhook = getattr(patient, 'gchat_webhook', None)
-        if webhook:
-            send_gchat(webhook, body)
+        if webhook and send_gchat(webhook, body):
+            self.count_items('chats')
         return f"Cancellation notification sent for appointment {appointment_id}"
 
 @celery.task(name='tasks.daily_reminder', bind=True)
 def daily_reminder(self):
-    from app import app, mail
-    from models.database import Appointment
-    from flask_mail import Message
+    from app import app
+    from models.database import db, Appointment, Patient, Doctor, Department
     with app.app_context():
         today = datetime.now().date()
-        appts = Appointment.query.filter(Appointment.date == today, Appointment.status == 'booked').all()
-        sent = 0
-        for a in appts:
-            patient = a.patient
-            doctor = a.doctor
-            dept_name = doctor.department.name if doctor.department else 'General'
+        rows = db.session.query(
+            Appointment.time, Patient.id, Patient.full_name, Patient.email, Patient.gchat_webhook, Doctor.name, Department.name
+        ).join(Patient, Patient.id == Appointment.patient_id).join(Doctor, Doctor.id == Appointment.doctor_id).outerjoin(
+            Department, Department.id == Doctor.department_id
+        ).filter(Appointment.date == today, Appointment.status == 'booked').order_by(Appointment.time).all()
+        recipients = []
+        for appt_time, patient_id, patient_name, email, webhook, doctor_name, dept_name in rows:
             text = (
-                f"Reminder: You have an appointment today with Dr. {doctor.name} "
-                f"at {a.time.strftime('%H:%M')} in {dept_name} department."
+                f"Reminder: You have an appointment today with Dr. {doctor_name} "
+                f"at {appt_time.strftime('%H:%M')} in {dept_name or 'General'} department."
             )
-            if patient.email:
-                try:
-                    msg = Message(
-                        "Appointment Reminder - Today",
-                        recipients=[patient.email]
-                    )
-                    msg.body = f"Hello {patient.full_name},\n\n{text}\n\nThanks,\nHospital"
-                    mail.send(msg)
-                    sent += 1
-                except Exception as e:
-                    print(f"Email send failed for patient {patient.id}: {e}")
-            webhook = getattr(patient, 'gchat_webhook', None)
-            if webhook:
-                send_gchat(webhook, text)
-        return f"Daily reminders sent: {sent} emails"
+            recipients.append({'patient_id': patient_id, 'name': patient_name, 'email': email, 'webhook': webhook, 'text': text})
+        if not recipients:
+            return "Daily reminders sent: 0 emails"
+        batches = chunked(recipients, REMINDER_BATCH_SIZE)
+        self.count_items('recipients', len(recipients))
+        result = chord(group(send_reminder_batch.s(batch) for batch in batches))(summarize_reminders.s())
+        return f"Daily reminders dispatched: {len(recipients)} recipients in {len(batches)} batches (summary task {result.id})"
 
-@celery.task(name='tasks.monthly_doctor_report', bind=True)
-def monthly_doctor_report(self):
-    from app import app, mail
-    from models.database import Doctor, Appointment
+@celery.task(name='tasks.send_reminder_batch', bind=True)
+def send_reminder_batch(self, recipients):
+    from app import app
     from flask_mail import Message
     with app.app_context():
-        today = datetime.now().date()
-        first_of_month = today.replace(day=1)
-        last_month_end = first_of_month - timedelta(days=1)
-        last_month_start = last_month_end.replace(day=1)
-        doctors = Doctor.query.all()
-        reports_sent = 0
-
-        for doctor in doctors:
-            appts = Appointment.query.filter(Appointment.doctor_id == doctor.id,Appointment.date >= last_month_start,Appointment.date <= last_month_end).order_by(Appointment.date).all()
-            rows = ""
-            total_consultations = len(appts)
-            completed = sum(1 for a in appts if a.status == 'completed')
-            for a in appts:
-                treatment = a.treatment
-                diagnosis = treatment.diagnosis if treatment else "N/A"
-                prescription = treatment.prescription[:50] if treatment else "N/A"
-                rows += f"""
+        with_email = [r for r in recipients if r['email']]
+        messages = []
+        for r in with_email:
+            msg = Message("Appointment Reminder - Today", recipients=[r['email']])
+            msg.body = f"Hello {r['name']},\n\n{r['text']}\n\nThanks,\nHospital"
+            messages.append(msg)
+        errors = mailer.send_many(messages)
+        for r, error in zip(with_email, errors):
+            if error:
+                print(f"Email send failed for patient {r['patient_id']}: {error}")
+        failed = sum(1 for error in errors if error)
+        sent = len(errors) - failed
+        chats = send_webhooks([(r['webhook'], {"text": r['text']}) for r in recipients if r['webhook']])
+        self.count_items('emails', sent)
+        self.count_items('chats', chats)
+        return {'sent': sent, 'failed': failed, 'chats': chats}
+
+@celery.task(name='tasks.summarize_reminders', bind=True)
+def summarize_reminders(self, results):
+    sent = sum(r['sent'] for r in results)
+    failed = sum(r['failed'] for r in results)
+    chats = sum(r['chats'] for r in results)
+    return f"Daily reminders sent: {sent} emails ({failed} failed), {chats} chat messages across {len(results)} batches"
+
+REPORT_ROW_TEMPLATE = """
                 <tr>
-                    <td>{a.patient.full_name}</td>
-                    <td>{a.date.strftime('%Y-%m-%d')}</td>
-                    <td>{a.time.strftime('%H:%M')}</td>
-                    <td>{a.status}</td>
+                    <td>{patient}</td>
+                    <td>{date}</td>
+                    <td>{time}</td>
+                    <td>{status}</td>
                     <td>{diagnosis}</td>
                     <td>{prescription}</td>
-                </tr>
-                """
+                </tr>"""
 
-            html = f"""
+REPORT_TEMPLATE = """
             <html>
             <head>
                 <style>
@@ -177,13 +187,13 @@ def monthly_doctor_report(self):
                 </style>
             </head>
             <body>
-                <h2>Monthly Activity Report - Dr. {doctor.name}</h2>
+                <h2>Monthly Activity Report - Dr. {doctor}</h2>
                 <div class="summary">
-                    <p><strong>Period:</strong> {last_month_start.strftime('%B %d, %Y')} to {last_month_end.strftime('%B %d, %Y')}</p>
-                    <p><strong>Department:</strong> {doctor.department.name if doctor.department else 'N/A'}</p>
-                    <p><strong>Total Appointments:</strong> {total_consultations}</p>
+                    <p><strong>Period:</strong> {period_start} to {period_end}</p>
+                    <p><strong>Department:</strong> {department}</p>
+                    <p><strong>Total Appointments:</strong> {total}</p>
                     <p><strong>Completed:</strong> {completed}</p>
-                    <p><strong>Completion Rate:</strong> {(completed/total_consultations*100) if total_consultations > 0 else 0:.1f}%</p>
+                    <p><strong>Completion Rate:</strong> {rate:.1f}%</p>
                 </div>
 
                 <h3>Appointment Details</h3>
@@ -202,227 +212,331 @@ def monthly_doctor_report(self):
             </html>
             """
 
-            recipient = doctor.email if doctor.email else app.config.get('MAIL_USERNAME')
-            try:
-                msg = Message(
-                    f"Monthly Activity Report - {last_month_start.strftime('%B %Y')}",
-                    recipients=[recipient]
-                )
-                msg.html = html
-                mail.send(msg)
-                reports_sent += 1
-            except Exception as e:
-                print(f"Failed to send report to doctor {doctor.id}: {e}")
+def render_doctor_report(report):
+    rows = report['rows']
+    completed = sum(1 for r in rows if r['status'] == 'completed')
+    return REPORT_TEMPLATE.format(
+        doctor=escape(report['doctor']),
+        department=escape(report['department'] or 'N/A'),
+        period_start=report['period_start'],
+        period_end=report['period_end'],
+        total=len(rows),
+        completed=completed,
+        rate=(completed / len(rows) * 100) if rows else 0,
+        rows=''.join(REPORT_ROW_TEMPLATE.format(**{k: escape(str(v)) for k, v in r.items()}) for r in rows)
+    )
 
-        return f"Monthly reports sent to {reports_sent} doctors"
+@celery.task(name='tasks.monthly_doctor_report', bind=True)
+def monthly_doctor_report(self):
+    from app import app
+    from models.database import db, Doctor, Department, Appointment, Patient, Treatment
+    with app.app_context():
+        today = datetime.now().date()
+        first_of_month = today.replace(day=1)
+        last_month_end = first_of_month - timedelta(days=1)
+        last_month_start = last_month_end.replace(day=1)
+        rows = db.session.query(
+            Doctor.id, Doctor.name, Doctor.email, Department.name,
+            Appointment.id, Appointment.date, Appointment.time, Appointment.status,
+            Patient.full_name, Treatment.id, Treatment.diagnosis, Treatment.prescription
+        ).outerjoin(Department, Department.id == Doctor.department_id).outerjoin(
+            Appointment, (Appointment.doctor_id == Doctor.id) & (Appointment.date >= last_month_start) & (Appointment.date <= last_month_end)
+        ).outerjoin(Patient, Patient.id == Appointment.patient_id).outerjoin(
+            Treatment, Treatment.appointment_id == Appointment.id
+        ).order_by(Doctor.id, Appointment.date, Appointment.time).all()
+
+        reports = []
+        for doctor_id, doctor_rows in groupby(rows, key=lambda r: r[0]):
+            doctor_rows = list(doctor_rows)
+            _, name, email, dept_name = doctor_rows[0][:4]
+            reports.append({
+                'doctor_id': doctor_id,
+                'doctor': name,
+                'email': email,
+                'department': dept_name,
+                'period_start': last_month_start.strftime('%B %d, %Y'),
+                'period_end': last_month_end.strftime('%B %d, %Y'),
+                'subject': f"Monthly Activity Report - {last_month_start.strftime('%B %Y')}",
+                'rows': [
+                    {
+                        'patient': patient_name,
+                        'date': appt_date.strftime('%Y-%m-%d'),
+                        'time': appt_time.strftime('%H:%M'),
+                        'status': status,
+                        'diagnosis': diagnosis if treatment_id else 'N/A',
+                        'prescription': (prescription or '')[:50] if treatment_id else 'N/A',
+                    }
+                    for _, _, _, _, appointment_id, appt_date, appt_time, status, patient_name, treatment_id, diagnosis, prescription in doctor_rows
+                    if appointment_id is not None
+                ],
+            })
+        if not reports:
+            return "Monthly reports sent to 0 doctors"
+        self.count_items('doctors', len(reports))
+        result = chord(group(send_doctor_report.s(report) for report in reports))(summarize_doctor_reports.s())
+        return f"Monthly reports dispatched for {len(reports)} doctors (summary task {result.id})"
+
+@celery.task(name='tasks.send_doctor_report', bind=True)
+def send_doctor_report(self, report):
+    from app import app
+    from flask_mail import Message
+    with app.app_context():
+        recipient = report['email'] if report['email'] else app.config.get('MAIL_USERNAME')
+        try:
+            msg = Message(report['subject'], recipients=[recipient])
+            msg.html = render_doctor_report(report)
+            mailer.send(msg)
+            self.count_items('emails')
+            return True
+        except Exception as e:
+            print(f"Failed to send report to doctor {report['doctor_id']}: {e}")
+            return False
+
+@celery.task(name='tasks.summarize_doctor_reports', bind=True)
+def summarize_doctor_reports(self, results):
+    return f"Monthly reports sent to {sum(1 for r in results if r)} doctors"
 
 @celery.task(name='tasks.export_patient_treatments', bind=True)
 def export_patient_treatments(self, patient_id):
-    from app import app, mail
+    from app import app
     from models.database import Patient, Appointment
     from flask_mail import Message
+    from tasks.exports import export_path, export_link, treatment_export_rows, write_csv, MAX_ATTACHMENT_BYTES
     with app.app_context():
         patient = Patient.query.get(patient_id)
         if not patient:
             return "Patient not found"
 
-        appts = Appointment.query.filter_by(patient_id=patient_id).order_by(Appointment.date.desc()).all()
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow([
-            'user_id', 'username', 'patient_name', 'consulting_doctor',
-            'appointment_date', 'appointment_time', 'status',
-            'diagnosis', 'treatment', 'next_visit'
-        ])
-        for a in appts:
-            doctor_name = a.doctor.name if a.doctor else 'N/A'
-            diagnosis = a.treatment.diagnosis if a.treatment else 'N/A'
-            prescription = a.treatment.prescription if a.treatment else 'N/A'
-            next_visit = (
-                a.treatment.follow_up_date.isoformat()
-                if (a.treatment and a.treatment.follow_up_date)
-                else 'N/A'
-            )
-            writer.writerow([
-                patient.id,
-                patient.username,
-                patient.full_name,
-                doctor_name,
-                a.date.isoformat(),
-                a.time.strftime('%H:%M'),
-                a.status,
-                diagnosis,
-                prescription,
-                next_visit
-            ])
-
-        csv_data = output.getvalue()
-        output.close()
+        path = export_path(app, self.request.id)
+        self.count_items('rows', write_csv(path, treatment_export_rows(Appointment.patient_id == patient_id)))
 
         if patient.email:
             try:
                 msg = Message("Your Treatment History Export",recipients=[patient.email])
-                msg.body = (
-                    f"Dear {patient.full_name},\n\n"
-                    "Please find attached your complete treatment history.\n\n"
-                    "Regards,\nHospital Management System"
-                )
-                msg.attach(
-                    f"treatment_history_{patient.id}.csv",
-                    "text/csv",
-                    csv_data
-                )
-                mail.send(msg)
+                if os.path.getsize(path) <= MAX_ATTACHMENT_BYTES:
+                    msg.body = (
+                        f"Dear {patient.full_name},\n\n"
+                        "Please find attached your complete treatment history.\n\n"
+                        "Regards,\nHospital Management System"
+                    )
+                    with open(path, 'rb') as f:
+                        msg.attach(f"treatment_history_{patient.id}.csv", "text/csv", f.read())
+                else:
+                    msg.body = (
+                        f"Dear {patient.full_name},\n\n"
+                        "Your treatment history export is ready. It is too large to attach, "
+                        "please download it from the link below within 24 hours (you need to be logged in):\n\n"
+                        f"{export_link(app, self.request.id, patient.id)}\n\n"
+                        "Regards,\nHospital Management System"
+                    )
+                mailer.send(msg)
+                self.count_items('emails')
                 return f"Export completed and emailed to {patient.email}"
             except Exception as e:
                 return f"Export created but email failed: {e}"
         else:
             return "Export created but patient has no email"
 
+@celery.task(name='tasks.export_department_treatments', bind=True)
+def export_department_treatments(self, department_id):
+    from app import app
+    from models.database import Doctor
+    from tasks.exports import export_path, treatment_export_rows, write_csv
+    with app.app_context():
+        rows = write_csv(export_path(app, self.request.id), treatment_export_rows(Doctor.department_id == department_id))
+        self.count_items('rows', rows)
+        return f"Department export completed: {rows} rows"
+
+@celery.task(name='tasks.bulk_export', bind=True)
+def bulk_export(self, filters, fmt='csv', partitions=8):
+    from app import app, cache
+    from sqlalchemy import func
+    from models.database import db, Appointment, Doctor
+    from tasks.exports import export_criteria, partition_ranges, progress_key, EXPORT_FORMATS, MAX_PARTITIONS
+    if fmt not in EXPORT_FORMATS:
+        return f"Unsupported export format: {fmt}"
+    with app.app_context():
+        low, high = db.session.query(func.min(Appointment.id), func.max(Appointment.id)).join(
+            Doctor, Doctor.id == Appointment.doctor_id
+        ).filter(*export_criteria(filters)).one()
+        ranges = partition_ranges(low, high, max(1, min(partitions, MAX_PARTITIONS))) if low is not None else [(0, -1)]
+        job_id = self.request.id
+        cache.set(progress_key(job_id), {'state': 'RUNNING', 'total': len(ranges), 'filters': filters, 'format': fmt}, timeout=24 * 60 * 60)
+        cache.set(f'{progress_key(job_id)}:done', 0, timeout=24 * 60 * 60)
+        chord(group(
+            export_partition.s(job_id, index, start, end, filters, fmt) for index, (start, end) in enumerate(ranges)
+        ))(stitch_export.s(job_id, filters, fmt).on_error(mark_export_failed.s(job_id)))
+        return f"Bulk export dispatched in {len(ranges)} partitions"
+
+@celery.task(name='tasks.export_partition', bind=True)
+def export_partition(self, job_id, index, start, end, filters, fmt):
+    from app import app, cache
+    from models.database import db, Appointment
+    from tasks.exports import export_path, export_criteria, read_only_session, treatment_export_rows, write_part, progress_key
+    with app.app_context():
+        path = export_path(app, job_id, f'.part{index:04d}.{fmt}.gz')
+        with read_only_session(db.engine) as session:
+            rows = treatment_export_rows(
+                Appointment.id >= start, Appointment.id <= end, *export_criteria(filters),
+                session=session, order_by=(Appointment.id,)
+            )
+            count = write_part(path, rows, fmt)
+        self.count_items('rows', count)
+        cache.cache.inc(f'{progress_key(job_id)}:done')
+        return {'index': index, 'path': path, 'rows': count, 'id_range': [start, end]}
+
+@celery.task(name='tasks.stitch_export', bind=True)
+def stitch_export(self, parts, job_id, filters, fmt):
+    from app import app, cache
+    from tasks.exports import export_path, csv_header_member, file_sha256, progress_key
+    with app.app_context():
+        parts = sorted(parts, key=lambda p: p['index'])
+        path = export_path(app, job_id, f'.{fmt}.gz')
+        tmp_path = f"{path}.part"
+        manifest_parts = []
+        with open(tmp_path, 'wb') as out:
+            if fmt == 'csv':
+                out.write(csv_header_member())
+            for part in parts:
+                manifest_parts.append({
+                    'index': part['index'], 'id_range': part['id_range'], 'rows': part['rows'],
+                    'bytes': os.path.getsize(part['path']), 'sha256': file_sha256(part['path'])
+                })
+                with open(part['path'], 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        out.write(chunk)
+                os.remove(part['path'])
+        os.replace(tmp_path, path)
+        manifest = {
+            'job_id': job_id,
+            'format': fmt,
+            'filters': filters,
+            'file': os.path.basename(path),
+            'sha256': file_sha256(path),
+            'total_rows': sum(p['rows'] for p in parts),
+            'parts': manifest_parts,
+            'created_at': datetime.utcnow().isoformat(),
+        }
+        with open(export_path(app, job_id, '.manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        cache.set(progress_key(job_id), {
+            'state': 'COMPLETE', 'total': len(parts), 'filters': filters, 'format': fmt,
+            'total_rows': manifest['total_rows'], 'file': manifest['file']
+        }, timeout=24 * 60 * 60)
+        return f"Bulk export completed: {manifest['total_rows']} rows in {len(parts)} parts"
+
+@celery.task(name='tasks.mark_export_failed')
+def mark_export_failed(request, exc, traceback, job_id):
+    from app import app, cache
+    from tasks.exports import export_dir, progress_key
+    with app.app_context():
+        progress = cache.get(progress_key(job_id)) or {}
+        cache.set(progress_key(job_id), {**progress, 'state': 'FAILED', 'error': str(exc)}, timeout=24 * 60 * 60)
+        with os.scandir(export_dir(app)) as entries:
+            for entry in entries:
+                if entry.name.startswith(f'{job_id}.part'):
+                    os.remove(entry.path)
+        return f"Bulk export {job_id} failed: {exc}"
+
 @celery.task(name='tasks.send_appointment_record_pdf', bind=True)
 def send_appointment_record_pdf(self, appointment_id):
-    from app import app, mail
-    from models.database import Appointment
-    from flask_mail import Message
+    from app import app, cache
+    from models.queries import appointments_with_relations
+    from tasks.records import get_record_pdf, record_message
     with app.app_context():
-        appointment = Appointment.query.get(appointment_id)
+        appointment = appointments_with_relations().filter_by(id=appointment_id).first()
         if not appointment:
             return "Appointment not found"
-        
         patient = appointment.patient
-        doctor = appointment.doctor
-        treatment = appointment.treatment
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72,topMargin=72, bottomMargin=18)
-        elements = []
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1a5490'),
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#333333'),
-            spaceAfter=12,
-            spaceBefore=12
-        )
-        elements.append(Paragraph("Medical Record", title_style))
-        elements.append(Spacer(1, 0.2 * inch))
-
-        hospital_info = f"""
-        <para align=center>
-        <b>National Hospital</b><br/>
-        Healthcare Management System<br/>
-        Date: {datetime.now().strftime('%B %d, %Y')}
-        </para>
-        """
-
-        elements.append(Paragraph(hospital_info, styles['Normal']))
-        elements.append(Spacer(1, 0.3 * inch))
-        elements.append(Paragraph("Patient Information", heading_style))
-        
-        patient_data = [
-            ['Patient Name:', patient.full_name or 'N/A'],
-            ['Patient ID:', str(patient.id)],
-            ['Age:', str(patient.age) if patient.age else 'N/A'],
-            ['Gender:', patient.gender or 'N/A'],
-            ['Phone:', patient.phone or 'N/A'],
-            ['Email:', patient.email or 'N/A'],
-        ]
-        patient_table = Table(patient_data, colWidths=[2*inch, 4*inch])
-        patient_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        elements.append(patient_table)
-        elements.append(Spacer(1, 0.3 * inch))
-        elements.append(Paragraph("Appointment Details", heading_style))
-        
-        dept_name = doctor.department.name if doctor.department else 'N/A'
-        appointment_data = [
-            ['Doctor:', f"Dr. {doctor.name}"],
-            ['Department:', dept_name],
-            ['Appointment Date:', appointment.date.strftime('%B %d, %Y')],
-            ['Appointment Time:', appointment.time.strftime('%I:%M %p')],
-            ['Status:', appointment.status.upper()],
-            ['Reason for Visit:', appointment.reason or 'N/A'],
-        ]
-        appointment_table = Table(appointment_data, colWidths=[2*inch, 4*inch])
-        appointment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-            ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-        ]))
-        elements.append(appointment_table)
-        elements.append(Spacer(1, 0.3 * inch))
-
-        if treatment:
-            elements.append(Paragraph("Treatment Details", heading_style))
-            if treatment.diagnosis:
-                elements.append(Paragraph("<b>Diagnosis:</b>", styles['Normal']))
-                elements.append(Paragraph(treatment.diagnosis, styles['Normal']))
-                elements.append(Spacer(1, 0.1 * inch))
-
-            if treatment.prescription:
-                elements.append(Paragraph("<b>Prescription:</b>", styles['Normal']))
-                elements.append(Paragraph(treatment.prescription, styles['Normal']))
-                elements.append(Spacer(1, 0.1 * inch))
-
-            if treatment.notes:
-                elements.append(Paragraph("<b>Additional Notes:</b>", styles['Normal']))
-                elements.append(Paragraph(treatment.notes, styles['Normal']))
-                elements.append(Spacer(1, 0.1 * inch))
-
-            if treatment.follow_up_date:
-                followup_text = f"<b>Follow-up Date:</b> {treatment.follow_up_date.strftime('%B %d, %Y')}"
-                elements.append(Paragraph(followup_text, styles['Normal']))
-        else:
-            elements.append(Paragraph("Treatment Details", heading_style))
-            elements.append(Paragraph("<i>No treatment details available for this appointment.</i>", styles['Normal']))
-        
-        elements.append(Spacer(1, 0.5 * inch))
-        elements.append(Paragraph("", styles['Normal']))
-        doc.build(elements)
-        pdf_data = buffer.getvalue()
-        buffer.close()
+        if not patient.email:
+            return "Patient has no email address"
+        pdf_data, cached = get_record_pdf(appointment, cache)
+        self.count_items('pdfs_rendered', 0 if cached else 1)
+        try:
+            mailer.send(record_message(appointment, pdf_data))
+            self.count_items('emails')
+            return f"Medical record sent to {patient.email}"
+        except Exception as e:
+            return f"Failed to send email: {str(e)}"
 
-        if patient.email:
-            try:
-                msg = Message("Your Medical Record", recipients=[patient.email])
-                msg.body = f"""Dear {patient.full_name},
+@celery.task(name='tasks.send_appointment_records_batch', bind=True)
+def send_appointment_records_batch(self, appointment_ids):
+    from app import app, cache
+    from models.database import Appointment
+    from models.queries import appointments_with_relations
+    from tasks.records import get_record_pdf, record_message
+    with app.app_context():
+        appointments = appointments_with_relations().filter(Appointment.id.in_(appointment_ids)).order_by(Appointment.time).all()
+        failed = rendered = 0
+        messages = []
+        for appointment in appointments:
+            if not appointment.patient.email:
+                continue
+            pdf_data, cached = get_record_pdf(appointment, cache)
+            rendered += 0 if cached else 1
+            messages.append((appointment.id, record_message(appointment, pdf_data)))
+        errors = mailer.send_many([msg for _, msg in messages])
+        for (appointment_id, _), error in zip(messages, errors):
+            if error:
+                failed += 1
+                print(f"Failed to send record for appointment {appointment_id}: {error}")
+        sent = len(messages) - failed
+        self.count_items('emails', sent)
+        self.count_items('pdfs_rendered', rendered)
+        return f"Medical records sent: {sent} ({failed} failed, {rendered} rendered, {len(messages) - rendered} from cache)"
 
-Please find attached your medical record for the appointment with Dr. {doctor.name} on {appointment.date.strftime('%B %d, %Y')}.
+@celery.task(name='tasks.reconcile_dashboard_counters', bind=True)
+def reconcile_dashboard_counters(self):
+    from app import app
+    from models.queries import refresh_dashboard_counters
+    with app.app_context():
+        counters = refresh_dashboard_counters()
+        return (
+            f"Dashboard counters reconciled: {counters.total_patients} patients, {counters.total_doctors} doctors, "
+            f"{counters.total_appointments} appointments ({counters.pending_appointments} pending)"
+        )
 
-If you have any questions about this record, please contact our hospital.
+@celery.task(name='tasks.cleanup_exports', bind=True)
+def cleanup_exports(self):
+    from app import app
+    from tasks.exports import cleanup_exports as remove_expired_exports
+    removed = remove_expired_exports(app)
+    return f"Removed {removed} expired export files"
 
-Regards,
-National Hospital Management System"""
-                
-                filename = f"medical_record_{patient.id}_{appointment.id}.pdf"
-                msg.attach(filename, "application/pdf", pdf_data)
-                mail.send(msg)
-                return f"Medical record sent to {patient.email}"
-            except Exception as e:
-                return f"Failed to send email: {str(e)}"
-        else:
-            return "Patient has no email address"
+@celery.task(name='tasks.dispatch_notifications', bind=True)
+def dispatch_notifications(self):
+    from app import app
+    from tasks.relay import relay_once
+    with app.app_context():
+        result = relay_once(celery)
+        if result is None:
+            return "Notification dispatch already running"
+        return f"Notifications dispatched: {result['sent']} sent, {result['superseded']} superseded, {result['pending']} left pending"
+
+@celery.task(name='tasks.replay_failed_webhooks', bind=True)
+def replay_failed_webhooks(self):
+    from app import app
+    from models.database import db, FailedWebhook
+    with app.app_context():
+        pending = FailedWebhook.query.filter(
+            FailedWebhook.delivered_at.is_(None), FailedWebhook.replays < WEBHOOK_MAX_REPLAYS
+        ).order_by(FailedWebhook.id).limit(WEBHOOK_REPLAY_BATCH_SIZE).all()
+        if not pending:
+            return "Webhook replay: nothing pending"
+        results = deliver_many([(row.url, row.payload) for row in pending])
+        now = datetime.utcnow()
+        delivered = 0
+        for row, result in zip(pending, results):
+            row.replays += 1
+            row.attempts += result['attempts']
+            if result['ok']:
+                row.delivered_at = now
+                delivered += 1
+            else:
+                row.error = result['error']
+        db.session.commit()
+        self.count_items('webhooks', delivered)
+        return f"Webhook replay: {delivered} delivered, {len(pending) - delivered} still failing"
 
 celery.conf.beat_schedule = {
     'daily-reminder-morning': {
@@ -433,6 +547,22 @@ celery.conf.beat_schedule = {
         'task': 'tasks.monthly_doctor_report',
         'schedule': crontab(minute=0, hour=9, day_of_month='1'),
     },
+    'reconcile-dashboard-counters': {
+        'task': 'tasks.reconcile_dashboard_counters',
+        'schedule': crontab(minute='*/15'),
+    },
+    'dispatch-notifications': {
+        'task': 'tasks.dispatch_notifications',
+        'schedule': crontab(minute='*'),
+    },
+    'replay-failed-webhooks': {
+        'task': 'tasks.replay_failed_webhooks',
+        'schedule': crontab(minute='*/10'),
+    },
+    'cleanup-exports': {
+        'task': 'tasks.cleanup_exports',
+        'schedule': crontab(minute=30),
+    },
 }
 
 celery.conf.timezone = 'Asia/Kolkata'
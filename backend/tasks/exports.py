@@ -0,0 +1,166 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from sqlalchemy.orm import Session
+
+EXPORT_HEADER = [
+    'user_id', 'username', 'patient_name', 'consulting_doctor',
+    'appointment_date', 'appointment_time', 'status',
+    'diagnosis', 'treatment', 'next_visit'
+]
+EXPORT_BATCH_SIZE = 1000
+MAX_ATTACHMENT_BYTES = 10 * 1024 * 1024
+EXPORT_FORMATS = ('csv', 'jsonl')
+MAX_PARTITIONS = 64
+EXPORT_MIMETYPES = {'.csv': 'text/csv', '.csv.gz': 'application/gzip', '.jsonl.gz': 'application/gzip'}
+EXPORT_LINK_MAX_AGE = 24 * 60 * 60
+
+def export_dir(app):
+    path = app.config['EXPORT_DIR']
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def export_path(app, task_id, ext='.csv'):
+    return os.path.join(export_dir(app), f"{task_id}{ext}")
+
+def find_export(app, task_id):
+    for ext, mimetype in EXPORT_MIMETYPES.items():
+        path = export_path(app, task_id, ext)
+        if os.path.exists(path):
+            return path, mimetype, ext
+    return None, None, None
+
+def export_serializer(app):
+    from itsdangerous import URLSafeTimedSerializer
+    return URLSafeTimedSerializer(app.config['SECRET_KEY'], salt='export-download')
+
+def export_token(app, task_id, user_id):
+    return export_serializer(app).dumps({'task_id': task_id, 'user_id': user_id})
+
+def export_link(app, task_id, user_id):
+    from flask import url_for
+    with app.test_request_context(base_url=app.config['PUBLIC_BASE_URL']):
+        return url_for('routes.download_export', task_id=task_id, token=export_token(app, task_id, user_id), _external=True)
+
+def cleanup_exports(app, max_age=EXPORT_LINK_MAX_AGE):
+    cutoff = time.time() - max_age
+    removed = 0
+    with os.scandir(export_dir(app)) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+    return removed
+
+def treatment_export_rows(*criteria, session=None, order_by=None):
+    from models.database import db, Appointment, Patient, Doctor, Treatment
+    query = (session or db.session).query(
+        Patient.id, Patient.username, Patient.full_name, Doctor.name,
+        Appointment.date, Appointment.time, Appointment.status,
+        Treatment.id, Treatment.diagnosis, Treatment.prescription, Treatment.follow_up_date
+    ).join(Patient, Patient.id == Appointment.patient_id).outerjoin(
+        Doctor, Doctor.id == Appointment.doctor_id
+    ).outerjoin(Treatment, Treatment.appointment_id == Appointment.id).filter(*criteria).order_by(
+        *(order_by or (Patient.id, Appointment.date.desc(), Appointment.id.desc()))
+    ).yield_per(EXPORT_BATCH_SIZE)
+    for (patient_id, username, full_name, doctor_name, appt_date, appt_time, status,
+         treatment_id, diagnosis, prescription, follow_up_date) in query:
+        yield [
+            patient_id,
+            username,
+            full_name,
+            doctor_name or 'N/A',
+            appt_date.isoformat(),
+            appt_time.strftime('%H:%M'),
+            status,
+            diagnosis if treatment_id else 'N/A',
+            prescription if treatment_id else 'N/A',
+            follow_up_date.isoformat() if treatment_id and follow_up_date else 'N/A'
+        ]
+
+def write_csv(path, rows):
+    count = 0
+    tmp_path = f"{path}.part"
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_HEADER)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+def export_criteria(filters):
+    from models.database import Appointment, Doctor
+    criteria = []
+    if filters.get('department_id'):
+        criteria.append(Doctor.department_id == filters['department_id'])
+    if filters.get('from'):
+        criteria.append(Appointment.date >= datetime.strptime(filters['from'], '%Y-%m-%d').date())
+    if filters.get('to'):
+        criteria.append(Appointment.date <= datetime.strptime(filters['to'], '%Y-%m-%d').date())
+    return criteria
+
+def partition_ranges(low, high, partitions):
+    size = max(1, -(-(high - low + 1) // partitions))
+    return [(start, min(start + size - 1, high)) for start in range(low, high + 1, size)]
+
+@contextmanager
+def read_only_session(engine):
+    with engine.connect() as conn:
+        if conn.dialect.name == 'sqlite':
+            conn.exec_driver_sql('PRAGMA query_only = ON')
+        elif conn.dialect.name == 'postgresql':
+            conn.exec_driver_sql('SET TRANSACTION READ ONLY')
+        session = Session(bind=conn)
+        try:
+            yield session
+        finally:
+            session.close()
+            conn.rollback()
+            if conn.dialect.name == 'sqlite':
+                conn.exec_driver_sql('PRAGMA query_only = OFF')
+
+def write_part(path, rows, fmt):
+    count = 0
+    with gzip.open(path, 'wt', newline='') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        for row in rows:
+            if writer:
+                writer.writerow(row)
+            else:
+                f.write(json.dumps(dict(zip(EXPORT_HEADER, row))) + '\n')
+            count += 1
+    return count
+
+def csv_header_member():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(EXPORT_HEADER)
+    return gzip.compress(buffer.getvalue().encode())
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def progress_key(job_id):
+    return f'export:progress:{job_id}'
+
+def export_progress(job_id):
+    from app import cache
+    progress = cache.get(progress_key(job_id))
+    if progress is None:
+        return None
+    progress['done'] = int(cache.get(f'{progress_key(job_id)}:done') or 0)
+    return progress
@@ -0,0 +1,107 @@
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import Future
+
+COALESCE_WINDOW = float(os.getenv('MAIL_COALESCE_WINDOW', 0.05))
+MAX_BATCH = int(os.getenv('MAIL_MAX_BATCH', 50))
+IDLE_TIMEOUT = float(os.getenv('MAIL_IDLE_TIMEOUT', 60))
+RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+class PooledMailer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+        self.queue = None
+        self.thread = None
+        self.conn = None
+        self.connects = 0
+
+    def start(self):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.queue = queue.Queue()
+                self.conn = None
+                self.thread = threading.Thread(target=self.run, name='mailer', daemon=True)
+                self.thread.start()
+
+    def submit(self, msg):
+        self.start()
+        future = Future()
+        self.queue.put((msg, future))
+        return future
+
+    def send(self, msg):
+        return self.submit(msg).result()
+
+    def send_many(self, messages):
+        futures = [self.submit(msg) for msg in messages]
+        return [future.exception() for future in futures]
+
+    def stop(self, timeout=10):
+        if self.thread and self.pid == os.getpid() and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(timeout)
+
+    def run(self):
+        from app import app
+        with app.app_context():
+            while True:
+                try:
+                    item = self.queue.get(timeout=IDLE_TIMEOUT)
+                except queue.Empty:
+                    self.close()
+                    continue
+                if item is None:
+                    break
+                batch = [item]
+                deadline = time.monotonic() + COALESCE_WINDOW
+                while len(batch) < MAX_BATCH:
+                    try:
+                        item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.queue.put(None)
+                        break
+                    batch.append(item)
+                self.flush(batch)
+            self.close()
+
+    def flush(self, batch):
+        for msg, future in batch:
+            try:
+                try:
+                    self.connection().send(msg)
+                except RECONNECT_ERRORS:
+                    self.close()
+                    self.connection().send(msg)
+                future.set_result(True)
+            except Exception as e:
+                if isinstance(e, RECONNECT_ERRORS):
+                    self.close()
+                future.set_exception(e)
+
+    def connection(self):
+        from app import mail
+        if self.conn is None:
+            self.conn = mail.connect().__enter__()
+            self.connects += 1
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.__exit__(None, None, None)
+            except smtplib.SMTPServerDisconnected:
+                pass
+            except Exception as e:
+                print(f"SMTP close failed: {e}")
+            self.conn = None
+
+mailer = PooledMailer()
+atexit.register(mailer.stop)
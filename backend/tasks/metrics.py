@@ -0,0 +1,104 @@
+import threading
+import time
+from collections import Counter
+from celery import Task
+from celery.exceptions import Retry
+from celery.signals import before_task_publish
+
+METRICS_PREFIX = 'task_metrics'
+RUNTIME_BUCKETS_MS = (100, 500, 1000, 5000, 30000, 120000, 600000)
+ITEM_UNITS = ('emails', 'chats', 'pdfs_rendered', 'rows', 'recipients', 'doctors', 'webhooks')
+COUNTER_FIELDS = ('runs', 'failures', 'retries', 'runtime_ms', 'queue_wait_ms', 'queue_wait_samples')
+
+_current = threading.local()
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('enqueued_at', time.time())
+
+def metric_key(name, field):
+    return f'{METRICS_PREFIX}:{name}:{field}'
+
+def runtime_bucket(runtime_ms):
+    for bound in RUNTIME_BUCKETS_MS:
+        if runtime_ms <= bound:
+            return f'le_{bound}'
+    return 'le_inf'
+
+def record_task(name, deltas):
+    from app import cache
+    try:
+        for field, delta in deltas.items():
+            if delta:
+                cache.cache.inc(metric_key(name, field), int(round(delta)))
+    except Exception as e:
+        print(f"Task metrics update failed for {name}: {e}")
+
+class MeteredTask(Task):
+    def count_items(self, unit, count=1):
+        items = getattr(_current, 'items', None)
+        if items is not None:
+            items[unit] += count
+
+    def __call__(self, *args, **kwargs):
+        enqueued_at = None if self.request.is_eager else getattr(self.request, 'enqueued_at', None)
+        outer_items = getattr(_current, 'items', None)
+        items = _current.items = Counter()
+        started = time.time()
+        outcome = None
+        try:
+            if self.request_stack.top is None:
+                return super().__call__(*args, **kwargs)
+            return self.run(*args, **kwargs)
+        except Retry:
+            outcome = 'retries'
+            raise
+        except Exception:
+            outcome = 'failures'
+            raise
+        finally:
+            _current.items = outer_items
+            runtime_ms = (time.time() - started) * 1000
+            deltas = Counter({'runs': 1, 'runtime_ms': runtime_ms, runtime_bucket(runtime_ms): 1})
+            if outcome:
+                deltas[outcome] += 1
+            if enqueued_at:
+                deltas['queue_wait_ms'] += max(0, started - enqueued_at) * 1000
+                deltas['queue_wait_samples'] += 1
+            for unit, count in items.items():
+                deltas[f'items:{unit}'] += count
+            record_task(self.name, deltas)
+
+def task_metrics(names, units=ITEM_UNITS):
+    from app import cache
+    buckets = [f'le_{bound}' for bound in RUNTIME_BUCKETS_MS] + ['le_inf']
+    fields = list(COUNTER_FIELDS) + buckets + [f'items:{unit}' for unit in units]
+    result = {}
+    for name in names:
+        values = dict(zip(fields, (int(v or 0) for v in cache.get_many(*[metric_key(name, f) for f in fields]))))
+        if not values['runs']:
+            continue
+        runtime_seconds = values['runtime_ms'] / 1000
+        result[name] = {
+            'runs': values['runs'],
+            'failures': values['failures'],
+            'retries': values['retries'],
+            'avg_runtime_ms': round(values['runtime_ms'] / values['runs'], 1),
+            'avg_queue_wait_ms': round(values['queue_wait_ms'] / values['queue_wait_samples'], 1) if values['queue_wait_samples'] else None,
+            'runtime_histogram_ms': {bucket: values[bucket] for bucket in buckets},
+            'items': {unit: values[f'items:{unit}'] for unit in units if values[f'items:{unit}']},
+            'items_per_second': {
+                unit: round(values[f'items:{unit}'] / runtime_seconds, 2)
+                for unit in units if values[f'items:{unit}'] and runtime_seconds
+            },
+        }
+    return result
+
+def queue_depth(celery):
+    try:
+        with celery.connection_for_read() as conn:
+            return conn.default_channel.queue_declare(queue=celery.conf.task_default_queue, passive=True).message_count
+    except Exception as e:
+        print(f"Queue depth unavailable: {e}")
+        return None
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import json
+from datetime import datetime
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+
+RECORD_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+STYLES = getSampleStyleSheet()
+NORMAL_STYLE = STYLES['Normal']
+TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=STYLES['Heading1'],
+    fontSize=24,
+    textColor=colors.HexColor('#1a5490'),
+    spaceAfter=30,
+    alignment=TA_CENTER
+)
+HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=STYLES['Heading2'],
+    fontSize=14,
+    textColor=colors.HexColor('#333333'),
+    spaceAfter=12,
+    spaceBefore=12
+)
+INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+])
+INFO_COL_WIDTHS = [2*inch, 4*inch]
+HOSPITAL_INFO_TEMPLATE = """
+        <para align=center>
+        <b>National Hospital</b><br/>
+        Healthcare Management System<br/>
+        Last updated: {date}
+        </para>
+        """
+
+def record_data(appointment):
+    patient = appointment.patient
+    doctor = appointment.doctor
+    treatment = appointment.treatment
+    return {
+        'appointment_id': appointment.id,
+        'appointment_updated_at': appointment.updated_at.isoformat() if appointment.updated_at else None,
+        'treatment_updated_at': treatment.updated_at.isoformat() if treatment and treatment.updated_at else None,
+        'patient': [
+            ['Patient Name:', patient.full_name or 'N/A'],
+            ['Patient ID:', str(patient.id)],
+            ['Age:', str(patient.age) if patient.age else 'N/A'],
+            ['Gender:', patient.gender or 'N/A'],
+            ['Phone:', patient.phone or 'N/A'],
+            ['Email:', patient.email or 'N/A'],
+        ],
+        'appointment': [
+            ['Doctor:', f"Dr. {doctor.name}"],
+            ['Department:', doctor.department.name if doctor.department else 'N/A'],
+            ['Appointment Date:', appointment.date.strftime('%B %d, %Y')],
+            ['Appointment Time:', appointment.time.strftime('%I:%M %p')],
+            ['Status:', appointment.status.upper()],
+            ['Reason for Visit:', appointment.reason or 'N/A'],
+        ],
+        'treatment': {
+            'diagnosis': treatment.diagnosis,
+            'prescription': treatment.prescription,
+            'notes': treatment.notes,
+            'follow_up_date': treatment.follow_up_date.strftime('%B %d, %Y') if treatment.follow_up_date else None,
+        } if treatment else None,
+    }
+
+def record_date(data):
+    updated = max(filter(None, (data['appointment_updated_at'], data['treatment_updated_at'])), default=None)
+    return datetime.fromisoformat(updated).strftime('%B %d, %Y') if updated else 'N/A'
+
+def record_cache_key(data):
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return f'record_pdf:{digest}'
+
+def render_record_pdf(data):
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    elements = [
+        Paragraph("Medical Record", TITLE_STYLE),
+        Spacer(1, 0.2 * inch),
+        Paragraph(HOSPITAL_INFO_TEMPLATE.format(date=record_date(data)), NORMAL_STYLE),
+        Spacer(1, 0.3 * inch),
+        Paragraph("Patient Information", HEADING_STYLE),
+    ]
+    patient_table = Table(data['patient'], colWidths=INFO_COL_WIDTHS)
+    patient_table.setStyle(INFO_TABLE_STYLE)
+    elements += [patient_table, Spacer(1, 0.3 * inch), Paragraph("Appointment Details", HEADING_STYLE)]
+    appointment_table = Table(data['appointment'], colWidths=INFO_COL_WIDTHS)
+    appointment_table.setStyle(INFO_TABLE_STYLE)
+    elements += [appointment_table, Spacer(1, 0.3 * inch), Paragraph("Treatment Details", HEADING_STYLE)]
+
+    treatment = data['treatment']
+    if treatment:
+        for label, key in (('Diagnosis', 'diagnosis'), ('Prescription', 'prescription'), ('Additional Notes', 'notes')):
+            if treatment[key]:
+                elements.append(Paragraph(f"<b>{label}:</b>", NORMAL_STYLE))
+                elements.append(Paragraph(treatment[key], NORMAL_STYLE))
+                elements.append(Spacer(1, 0.1 * inch))
+        if treatment['follow_up_date']:
+            elements.append(Paragraph(f"<b>Follow-up Date:</b> {treatment['follow_up_date']}", NORMAL_STYLE))
+    else:
+        elements.append(Paragraph("<i>No treatment details available for this appointment.</i>", NORMAL_STYLE))
+
+    elements.append(Spacer(1, 0.5 * inch))
+    elements.append(Paragraph("", NORMAL_STYLE))
+    doc.build(elements)
+    return buffer.getvalue()
+
+def get_record_pdf(appointment, cache=None):
+    data = record_data(appointment)
+    key = record_cache_key(data)
+    if cache is not None:
+        try:
+            pdf_data = cache.get(key)
+            if pdf_data is not None:
+                return pdf_data, True
+        except Exception as e:
+            print(f"Record cache unavailable: {e}")
+    pdf_data = render_record_pdf(data)
+    if cache is not None:
+        try:
+            cache.set(key, pdf_data, timeout=RECORD_CACHE_TIMEOUT)
+        except Exception as e:
+            print(f"Record cache unavailable: {e}")
+    return pdf_data, False
+
+def record_message(appointment, pdf_data):
+    from flask_mail import Message
+    patient = appointment.patient
+    msg = Message("Your Medical Record", recipients=[patient.email])
+    msg.body = f"""Dear {patient.full_name},
+
+Please find attached your medical record for the appointment with Dr. {appointment.doctor.name} on {appointment.date.strftime('%B %d, %Y')}.
+
+If you have any questions about this record, please contact our hospital.
+
+Regards,
+National Hospital Management System"""
+    msg.attach(f"medical_record_{patient.id}_{appointment.id}.pdf", "application/pdf", pdf_data)
+    return msg
@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RELAY_INTERVAL = float(os.getenv('OUTBOX_RELAY_INTERVAL', 0.5))
+
+def relay_once(celery, min_age=None):
+    from app import cache
+    from models.notifications import dispatch_notifications, DISPATCH_LOCK, COALESCE_SECONDS
+    if not cache.add(DISPATCH_LOCK, 1, timeout=60):
+        return None
+    try:
+        with celery.producer_or_acquire() as producer:
+            return dispatch_notifications(
+                lambda name, args: celery.send_task(name, args=args, producer=producer),
+                min_age=COALESCE_SECONDS if min_age is None else min_age
+            )
+    finally:
+        cache.delete(DISPATCH_LOCK)
+
+def run():
+    from app import app
+    from tasks.celery_tasks import celery
+    print(f"Outbox relay polling every {RELAY_INTERVAL}s")
+    while True:
+        result = None
+        try:
+            with app.app_context():
+                result = relay_once(celery)
+        except Exception as e:
+            print(f"Outbox relay error: {e}")
+        if not result or not (result['sent'] or result['superseded']):
+            time.sleep(RELAY_INTERVAL)
+
+if __name__ == '__main__':
+    run()
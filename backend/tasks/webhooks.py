@@ -0,0 +1,103 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+MAX_WORKERS = 8
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+HOST_RATE_PER_SECOND = 5
+REQUEST_TIMEOUT = 5
+
+_lock = threading.Lock()
+_session = None
+_executor = None
+
+def get_session():
+    global _session
+    with _lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_WORKERS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='webhook')
+        return _executor
+
+class HostRateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+rate_limiter = HostRateLimiter(HOST_RATE_PER_SECOND)
+
+def backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(BACKOFF_MAX, float(retry_after))
+        except ValueError:
+            pass
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+
+def deliver(url, payload):
+    from requests import RequestException
+    host = urlsplit(url).netloc
+    error = None
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        rate_limiter.wait(host)
+        retry_after = None
+        try:
+            response = get_session().post(url, json=payload, timeout=REQUEST_TIMEOUT)
+            if response.status_code < 400:
+                return {'ok': True, 'attempts': attempt, 'error': None}
+            error = f"HTTP {response.status_code}"
+            if response.status_code < 500 and response.status_code != 429:
+                return {'ok': False, 'attempts': attempt, 'error': error}
+            retry_after = response.headers.get('Retry-After')
+        except RequestException as e:
+            error = str(e)
+        if attempt < MAX_ATTEMPTS:
+            time.sleep(backoff_delay(attempt, retry_after))
+    return {'ok': False, 'attempts': MAX_ATTEMPTS, 'error': error}
+
+def deliver_many(messages):
+    futures = [get_executor().submit(deliver, url, payload) for url, payload in messages]
+    return [future.result() for future in futures]
+
+def record_failures(failures):
+    from models.database import db, FailedWebhook
+    if not failures:
+        return
+    try:
+        db.session.add_all([
+            FailedWebhook(url=url, payload=payload, error=result['error'], attempts=result['attempts'])
+            for (url, payload), result in failures
+        ])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Failed to record webhook failures: {e}")
+
+def send_webhooks(messages):
+    results = deliver_many(messages)
+    record_failures([(message, result) for message, result in zip(messages, results) if not result['ok']])
+    return sum(1 for result in results if result['ok'])
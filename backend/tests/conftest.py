@@ -0,0 +1,48 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'import.db'))
+
+import app as app_module
+from app import create_app, cache
+from models.database import db
+from models.seed import init_db
+
+@pytest.fixture
+def app_config():
+    return {}
+
+@pytest.fixture
+def app(tmp_path, monkeypatch, app_config):
+    test_app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'CACHE_TYPE': 'SimpleCache',
+        'EXPORT_DIR': str(tmp_path / 'exports'),
+        'MAIL_SUPPRESS_SEND': True,
+        **app_config,
+    })
+    monkeypatch.setattr(app_module, 'app', test_app)
+    with test_app.app_context():
+        init_db()
+        yield test_app
+        cache.clear()
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def login():
+    def log_in(client, username, password='pw'):
+        response = client.post('/login', json={'username': username, 'password': password})
+        assert response.status_code == 200, response.json
+        return client
+    return log_in
@@ -0,0 +1,68 @@
+from datetime import date, timedelta
+
+import pytest
+
+from models.database import db, Doctor, DoctorAvailability
+
+START = date.today() + timedelta(days=7)
+
+@pytest.fixture
+def doctor(app, login):
+    doctor = Doctor(name='Doc', username='doc', department_id=1)
+    doctor.set_password('pw')
+    db.session.add(doctor)
+    db.session.commit()
+    return doctor.id, login(app.test_client(), 'doc')
+
+def saved_slots(doctor_id):
+    return sorted(
+        (row.date, row.start_time.strftime('%H:%M'), row.end_time.strftime('%H:%M'))
+        for row in DoctorAvailability.query.filter_by(doctor_id=doctor_id, is_enabled=True)
+    )
+
+def test_template_expands_and_resave_is_a_no_op(doctor):
+    doctor_id, client = doctor
+    body = {'template': {
+        'from': START.isoformat(), 'to': (START + timedelta(days=13)).isoformat(),
+        'weekdays': {str(START.weekday()): [{'start': '09:00', 'end': '12:00'}]},
+    }}
+    response = client.post(f'/doctors/{doctor_id}/availability', json=body)
+    assert response.status_code == 200
+    assert response.json['inserted'] == 2
+    assert saved_slots(doctor_id) == [(START, '09:00', '12:00'), (START + timedelta(days=7), '09:00', '12:00')]
+
+    response = client.post(f'/doctors/{doctor_id}/availability', json=body)
+    assert (response.json['inserted'], response.json['deleted']) == (0, 0)
+
+def test_explicit_days_override_the_template(doctor):
+    doctor_id, client = doctor
+    response = client.post(f'/doctors/{doctor_id}/availability', json={
+        'template': {'from': START.isoformat(), 'to': START.isoformat(), 'weekdays': {str(START.weekday()): [{'start': '09:00', 'end': '12:00'}]}},
+        'days': [{'date': START.isoformat(), 'enabled': True, 'slots': [{'start': '14:00', 'end': '15:00'}]}],
+    })
+    assert response.status_code == 200
+    assert saved_slots(doctor_id) == [(START, '14:00', '15:00')]
+
+@pytest.mark.parametrize('body, field', [
+    ({'template': {'to': START.isoformat(), 'weekdays': {}}}, 'from'),
+    ({'template': {'from': START.isoformat(), 'weekdays': {}}}, 'to'),
+    ({'days': [{'date': START.isoformat(), 'slots': []}]}, 'enabled'),
+    ({'days': [{'enabled': True, 'slots': []}]}, 'date'),
+])
+def test_missing_fields_are_rejected_by_name(doctor, body, field):
+    doctor_id, client = doctor
+    response = client.post(f'/doctors/{doctor_id}/availability', json=body)
+    assert response.status_code == 400
+    assert field in response.json['error']
+
+def test_invalid_day_leaves_schedule_untouched(doctor):
+    doctor_id, client = doctor
+    client.post(f'/doctors/{doctor_id}/availability', json=[
+        {'date': START.isoformat(), 'enabled': True, 'slots': [{'start': '09:00', 'end': '10:00'}]},
+    ])
+    response = client.post(f'/doctors/{doctor_id}/availability', json=[
+        {'date': START.isoformat(), 'enabled': False, 'slots': []},
+        {'date': (START + timedelta(days=1)).isoformat(), 'enabled': True, 'slots': [{'start': '11:00', 'end': '10:00'}]},
+    ])
+    assert response.status_code == 400
+    assert saved_slots(doctor_id) == [(START, '09:00', '10:00')]
@@ -0,0 +1,41 @@
+import os
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from tasks.exports import export_path, export_progress
+
+@pytest.mark.parametrize('partitions', [None, 'many', [4]])
+def test_rejects_invalid_partitions(app, login, partitions):
+    client = login(app.test_client(), 'admin', 'admin')
+    with mock.patch('celery.app.base.Celery.send_task') as send_task:
+        response = client.post('/admin/export', json={'partitions': partitions})
+    assert response.status_code == 400
+    assert 'partitions' in response.json['error']
+    send_task.assert_not_called()
+
+@pytest.mark.parametrize('partitions, expected', [(0, 1), ('3', 3), (10_000, 64)])
+def test_clamps_partitions(app, login, partitions, expected):
+    client = login(app.test_client(), 'admin', 'admin')
+    with mock.patch('celery.app.base.Celery.send_task') as send_task:
+        send_task.return_value.id = 'job-1'
+        response = client.post('/admin/export', json={'partitions': partitions})
+    assert response.status_code == 202
+    assert send_task.call_args.kwargs['args'][2] == expected
+
+def test_failed_partition_marks_export_failed(app):
+    from tasks.celery_tasks import bulk_export, mark_export_failed
+    with mock.patch('tasks.celery_tasks.chord') as chord:
+        bulk_export.apply(args=[{}, 'csv', 2], task_id='job-2')
+    callback = chord.return_value.call_args.args[0]
+    assert [errback['task'] for errback in callback.options['link_error']] == ['tasks.mark_export_failed']
+
+    part = export_path(app, 'job-2', '.part0000.csv.gz')
+    open(part, 'wb').close()
+    mark_export_failed(SimpleNamespace(id='part-task'), RuntimeError('disk full'), None, 'job-2')
+    progress = export_progress('job-2')
+    assert progress['state'] == 'FAILED'
+    assert progress['error'] == 'disk full'
+    assert progress['total'] == 1
+    assert not os.path.exists(part)
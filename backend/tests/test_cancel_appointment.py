@@ -0,0 +1,79 @@
+from datetime import date, time, timedelta
+
+import pytest
+
+import routes.routes as routes_module
+from models.database import db, Patient, Doctor, Appointment, NotificationOutbox
+from models.notifications import enqueue_notification
+
+@pytest.fixture
+def appointment_id(app):
+    patient = Patient(username='pat', full_name='Pat', email='pat@example.com')
+    patient.set_password('pw')
+    doctor = Doctor(name='Doc', username='doc', department_id=1)
+    doctor.set_password('pw')
+    db.session.add_all([patient, doctor])
+    db.session.flush()
+    appointment = Appointment(
+        patient_id=patient.id, doctor_id=doctor.id, date=date.today() + timedelta(days=1),
+        time=time(9, 0), status='booked'
+    )
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment.id
+
+def test_cancel_queues_one_notification(app, login, appointment_id):
+    client = login(app.test_client(), 'pat')
+    response = client.delete(f'/appointment/{appointment_id}', json={'reason': 'travel'})
+    assert response.status_code == 200
+    assert response.json['duplicate'] is False
+    assert db.session.get(Appointment, appointment_id).status == 'cancelled'
+    assert NotificationOutbox.query.filter_by(appointment_id=appointment_id, event='cancelled').count() == 1
+
+def test_concurrent_cancel_returns_duplicate(app, login, appointment_id, monkeypatch):
+    def racing_enqueue(appointment_id, event, payload=None):
+        row = enqueue_notification(appointment_id, event, payload)
+        # the same outbox version committed by a concurrent cancel of this appointment
+        db.session.add(NotificationOutbox(appointment_id=appointment_id, event=event, version=row.version, payload={}))
+        return row
+    monkeypatch.setattr(routes_module, 'enqueue_notification', racing_enqueue)
+
+    client = login(app.test_client(), 'pat')
+    response = client.delete(f'/appointment/{appointment_id}', json={})
+    assert response.status_code == 200
+    assert response.json['duplicate'] is True
+    assert NotificationOutbox.query.filter_by(appointment_id=appointment_id).count() == 0
+
+def test_cancelling_twice_is_a_duplicate(app, login, appointment_id, monkeypatch):
+    client = login(app.test_client(), 'pat')
+    assert client.delete(f'/appointment/{appointment_id}', json={}).json['duplicate'] is False
+    invalidated = []
+    monkeypatch.setattr(routes_module, 'invalidate_doctor_day', lambda *args: invalidated.append(args))
+    response = client.delete(f'/appointment/{appointment_id}', json={})
+    assert response.status_code == 200
+    assert response.json['duplicate'] is True
+    assert invalidated == []
+    assert NotificationOutbox.query.filter_by(appointment_id=appointment_id).count() == 1
+
+def test_deleted_appointment_ids_do_not_silence_new_bookings(app, login, appointment_id):
+    appointment = db.session.get(Appointment, appointment_id)
+    doctor_id, day = appointment.doctor_id, appointment.date
+    enqueue_notification(appointment_id, 'confirmed')
+    db.session.commit()
+
+    admin = login(app.test_client(), 'admin', 'admin')
+    assert admin.delete(f'/admin/patient/{appointment.patient_id}').status_code == 200
+    assert NotificationOutbox.query.count() == 0
+
+    patient = Patient(username='new', full_name='New Patient')
+    patient.set_password('pw')
+    db.session.add(patient)
+    db.session.flush()
+    booking = Appointment(patient_id=patient.id, doctor_id=doctor_id, date=day, time=time(9, 0), status='booked')
+    db.session.add(booking)
+    db.session.commit()
+    assert booking.id != appointment_id
+
+    client = login(app.test_client(), 'new')
+    response = client.post(f'/appointment/{booking.id}/notify-confirmed')
+    assert response.json['duplicate'] is False
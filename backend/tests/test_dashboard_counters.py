@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+from models.database import db, DashboardCounters
+from models.queries import refresh_dashboard_counters
+
+DAY = date.today() + timedelta(days=7)
+FIELDS = ('total_patients', 'total_doctors', 'total_appointments', 'pending_appointments')
+
+def counters():
+    db.session.expire_all()
+    return {field: getattr(db.session.get(DashboardCounters, 1), field) for field in FIELDS}
+
+def reconciled():
+    fresh = refresh_dashboard_counters()
+    return {field: getattr(fresh, field) for field in FIELDS}
+
+def test_routes_keep_counters_in_step_with_the_tables(app, login):
+    admin = login(app.test_client(), 'admin', 'admin')
+    assert app.test_client().post('/register', json={'username': 'pat', 'password': 'pw'}).status_code == 201
+    doctor_id = admin.post('/admin/doctor', json={'username': 'doc', 'password': 'pw', 'name': 'Doc', 'department_id': 1}).json['doctor_id']
+    doctor = login(app.test_client(), 'doc')
+    doctor.post(f'/doctors/{doctor_id}/availability', json=[
+        {'date': DAY.isoformat(), 'enabled': True, 'slots': [{'start': '09:00', 'end': '11:00'}]},
+    ])
+    patient = login(app.test_client(), 'pat')
+    booked = [
+        patient.post('/appointment', json={'doctor_id': doctor_id, 'date': DAY.isoformat(), 'time': slot}).json['appointment_id']
+        for slot in ('09:00', '09:30', '10:00')
+    ]
+    assert counters() == {'total_patients': 1, 'total_doctors': 1, 'total_appointments': 3, 'pending_appointments': 3}
+
+    doctor.post(f'/appointment/{booked[0]}/treatment', json={'diagnosis': 'Flu'})
+    patient.delete(f'/appointment/{booked[1]}', json={})
+    assert counters() == {'total_patients': 1, 'total_doctors': 1, 'total_appointments': 3, 'pending_appointments': 1}
+
+    admin.delete(f'/admin/doctor/{doctor_id}')
+    assert counters() == {'total_patients': 1, 'total_doctors': 0, 'total_appointments': 0, 'pending_appointments': 0}
+    assert counters() == reconciled()
+
+def test_reconciliation_task_repairs_drift(app):
+    from tasks.celery_tasks import reconcile_dashboard_counters
+    db.session.get(DashboardCounters, 1).total_appointments = 42
+    db.session.commit()
+    assert reconcile_dashboard_counters.apply().successful()
+    assert counters()['total_appointments'] == 0
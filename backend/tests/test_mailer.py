@@ -0,0 +1,86 @@
+import socket
+
+import pytest
+from aiosmtpd.controller import Controller
+from flask_mail import Message
+
+from tasks.mailer import PooledMailer
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+class RecordingHandler:
+    def __init__(self):
+        self.deliveries = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((session, envelope.rcpt_tos))
+        return '250 OK'
+
+    def connections(self):
+        return len({id(session) for session, _ in self.deliveries})
+
+class SMTPStub:
+    def __init__(self, port):
+        self.port = port
+        self.handler = RecordingHandler()
+        self.controller = None
+
+    def start(self):
+        self.controller = Controller(self.handler, hostname='127.0.0.1', port=self.port)
+        self.controller.start()
+
+    def stop(self):
+        if self.controller:
+            self.controller.stop()
+            self.controller = None
+
+PORT = free_port()
+
+@pytest.fixture
+def app_config():
+    return {
+        'MAIL_SERVER': '127.0.0.1', 'MAIL_PORT': PORT, 'MAIL_USE_TLS': False,
+        'MAIL_USERNAME': None, 'MAIL_PASSWORD': None, 'MAIL_SUPPRESS_SEND': False,
+    }
+
+@pytest.fixture
+def smtp(app):
+    server = SMTPStub(PORT)
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def mailer(app):
+    pooled = PooledMailer()
+    yield pooled
+    pooled.stop()
+
+def message(n):
+    return Message(f'Reminder {n}', sender='hospital@example.com', recipients=[f'patient{n}@example.com'], body='See you soon')
+
+def test_batch_shares_one_connection(smtp, mailer):
+    assert mailer.send_many([message(n) for n in range(10)]) == [None] * 10
+    assert len(smtp.handler.deliveries) == 10
+    assert smtp.handler.connections() == 1
+    assert mailer.connects == 1
+
+def test_reconnects_after_server_restart(smtp, mailer):
+    assert mailer.send(message(1)) is True
+    smtp.stop()
+    smtp.start()
+    assert mailer.send(message(2)) is True
+    assert [rcpt for _, rcpt in smtp.handler.deliveries] == [['patient1@example.com'], ['patient2@example.com']]
+    assert smtp.handler.connections() == 2
+    assert mailer.connects == 2
+
+def test_connection_errors_reach_the_caller(smtp, mailer):
+    assert mailer.send(message(1)) is True
+    smtp.stop()
+    future = mailer.submit(message(2))
+    assert isinstance(future.exception(timeout=10), ConnectionError)
+    with pytest.raises(ConnectionError):
+        mailer.send(message(3))
@@ -0,0 +1,67 @@
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import cache
+from models.database import db, Patient, Doctor, Appointment, Treatment
+
+N = 5
+
+@pytest.fixture
+def people(app):
+    patient = Patient(username='pat', full_name='Pat', email='pat@example.com')
+    patient.set_password('pw')
+    doctor = Doctor(name='Doc', username='doc', department_id=1, email='doc@example.com')
+    doctor.set_password('pw')
+    db.session.add_all([patient, doctor])
+    db.session.commit()
+    return patient.id, doctor.id
+
+def add_appointments(patient_id, doctor_id, count, start):
+    first = date.today() + timedelta(days=1)
+    for i in range(start, start + count):
+        appointment = Appointment(
+            patient_id=patient_id, doctor_id=doctor_id, date=first + timedelta(days=i),
+            time=time(9, 0), status='completed'
+        )
+        db.session.add(appointment)
+        db.session.flush()
+        db.session.add(Treatment(appointment_id=appointment.id, diagnosis=f'diagnosis {i}', prescription='rest'))
+    db.session.commit()
+
+def statement_count(client, url):
+    cache.clear()
+    statements = []
+    def count(*args):
+        statements.append(args[2])
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert response.status_code == 200, response.json
+    return len(statements), response.json
+
+def test_dashboards_and_history_use_fixed_statement_counts(app, login, people):
+    patient_id, doctor_id = people
+    admin = login(app.test_client(), 'admin', 'admin')
+    patient = login(app.test_client(), 'pat')
+    doctor = login(app.test_client(), 'doc')
+    endpoints = {
+        'admin dashboard': (admin, '/admin/dashboard', 4),
+        'patient dashboard': (patient, f'/patient/{patient_id}/dashboard', 2),
+        'doctor dashboard': (doctor, f'/doctor/{doctor_id}/dashboard', 2),
+        'history': (patient, f'/patient/{patient_id}/history', 2),
+    }
+
+    add_appointments(patient_id, doctor_id, N, 0)
+    small = {name: statement_count(client, url) for name, (client, url, _) in endpoints.items()}
+    add_appointments(patient_id, doctor_id, 9 * N, N)
+    large = {name: statement_count(client, url) for name, (client, url, _) in endpoints.items()}
+
+    for name, (_, _, expected) in endpoints.items():
+        assert small[name][0] == expected, name
+        assert large[name][0] == expected, name
+    assert len(large['history'][1]['history']) == 10 * N
+    assert len(large['doctor dashboard'][1]['appointments']) == 10 * N
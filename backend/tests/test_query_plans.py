@@ -0,0 +1,26 @@
+from datetime import date, time
+
+import pytest
+from sqlalchemy import event
+
+from models.database import db, Appointment
+from models.queries import appointments_with_relations, appointment_page
+
+def page_query_plan(criteria, **page_args):
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+    event.listen(db.engine, 'before_cursor_execute', capture)
+    try:
+        appointment_page(appointments_with_relations().filter(criteria), 10, **page_args)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', capture)
+    statement, parameters = statements[0]
+    return [row[3] for row in db.session.connection().exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+
+@pytest.mark.parametrize('column', [Appointment.doctor_id, Appointment.patient_id])
+@pytest.mark.parametrize('page_args', [{}, {'status': 'booked'}, {'cursor': (date(2030, 1, 7), time(9, 0), 5)}])
+def test_keyset_pages_read_in_index_order(app, column, page_args):
+    plan = page_query_plan(column == 1, **page_args)
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+    assert any(f'idx_appointment_{column.name.split("_")[0]}_order' in step for step in plan), plan
@@ -0,0 +1,27 @@
+from datetime import date, datetime, time
+
+from models.database import db, Patient, Doctor, Appointment, Treatment
+from tasks.records import record_data, record_date, record_cache_key
+
+def test_record_date_comes_from_the_record(app):
+    patient = Patient(username='pat', full_name='Pat')
+    patient.set_password('pw')
+    doctor = Doctor(name='Doc', username='doc', department_id=1)
+    doctor.set_password('pw')
+    db.session.add_all([patient, doctor])
+    db.session.flush()
+    appointment = Appointment(
+        patient_id=patient.id, doctor_id=doctor.id, date=date(2030, 1, 7), time=time(9, 0),
+        status='completed', updated_at=datetime(2030, 1, 7, 10, 0)
+    )
+    db.session.add(appointment)
+    db.session.commit()
+    data = record_data(appointment)
+    assert record_date(data) == 'January 07, 2030'
+
+    db.session.add(Treatment(appointment_id=appointment.id, diagnosis='Flu', updated_at=datetime(2030, 1, 9, 8, 0)))
+    db.session.commit()
+    db.session.refresh(appointment)
+    updated = record_data(appointment)
+    assert record_date(updated) == 'January 09, 2030'
+    assert record_cache_key(updated) != record_cache_key(data)
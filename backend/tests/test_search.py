@@ -0,0 +1,50 @@
+from datetime import date, time
+
+import pytest
+
+from models.database import db, Patient, Doctor, Appointment, Treatment
+from models.search import search
+
+@pytest.fixture
+def appointment_id(app):
+    patient = Patient(username='pat', full_name='Pat Example')
+    patient.set_password('pw')
+    doctor = Doctor(name='Doc', username='doc', department_id=1)
+    doctor.set_password('pw')
+    db.session.add_all([patient, doctor])
+    db.session.flush()
+    appointment = Appointment(patient_id=patient.id, doctor_id=doctor.id, date=date(2030, 1, 7), time=time(9, 0), status='completed')
+    db.session.add(appointment)
+    db.session.commit()
+    return appointment.id
+
+def add_treatments(appointment_id, count, prescription, padding=0):
+    db.session.execute(Treatment.__table__.insert(), [
+        {'appointment_id': appointment_id, 'diagnosis': f'visit {n}', 'prescription': prescription + ' as needed' * (n % (padding + 1))}
+        for n in range(count)
+    ])
+    db.session.commit()
+
+def test_name_match_ranks_above_many_body_matches(appointment_id):
+    patient = Patient(username='quill', full_name='Marigold Quillfeather')
+    patient.set_password('pw')
+    db.session.add(patient)
+    db.session.commit()
+    add_treatments(appointment_id, 1200, 'quillfeather tea twice daily')
+
+    results, has_more = search('quillfeather', ['patient', 'treatment'], 20)
+    assert results[0]['type'] == 'patient' and results[0]['id'] == patient.id
+    assert has_more
+
+def test_pages_neither_overlap_nor_leave_gaps(appointment_id):
+    # varying body lengths give distinct bm25 scores, so the order depends on the whole match set
+    add_treatments(appointment_id, 1050, 'ibuprofen after meals', padding=6)
+    seen = []
+    page = 0
+    while True:
+        results, has_more = search('ibuprofen', ['treatment'], 100, page * 100)
+        seen += [result['id'] for result in results]
+        page += 1
+        if not has_more:
+            break
+    assert len(seen) == len(set(seen)) == 1050
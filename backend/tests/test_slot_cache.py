@@ -0,0 +1,49 @@
+from datetime import date
+
+import pytest
+
+from routes.caching import cached_day_slots, invalidate_doctor_day, local_slots, local_slot_generations
+
+DAY = date(2030, 1, 7)
+
+@pytest.fixture(autouse=True)
+def empty_local_tier():
+    for lru in (local_slots, local_slot_generations):
+        lru.entries.clear()
+
+def test_write_during_load_is_not_cached(app):
+    loads = []
+    def stale_loader():
+        loads.append('stale')
+        # a booking commits and invalidates while this reader is still computing
+        invalidate_doctor_day(1, DAY)
+        return ['09:00']
+    def fresh_loader():
+        loads.append('fresh')
+        return []
+
+    assert cached_day_slots(1, DAY, stale_loader) == ['09:00']
+    assert cached_day_slots(1, DAY, fresh_loader) == []
+    assert cached_day_slots(1, DAY, fresh_loader) == []
+    assert loads == ['stale', 'fresh']
+
+def test_invalidation_is_per_doctor_and_day(app):
+    cached_day_slots(1, DAY, lambda: ['09:00'])
+    cached_day_slots(2, DAY, lambda: ['10:00'])
+    invalidate_doctor_day(1, DAY)
+    assert cached_day_slots(1, DAY, lambda: []) == []
+    assert cached_day_slots(2, DAY, lambda: []) == ['10:00']
+
+def test_warm_local_hit_skips_redis(app, monkeypatch):
+    from app import cache
+    cached_day_slots(3, DAY, lambda: ['11:00'])
+    calls = []
+    def counting(name, method):
+        def wrapper(*args, **kwargs):
+            calls.append(name)
+            return method(*args, **kwargs)
+        return wrapper
+    for name in ('get', 'add', 'set', 'get_many'):
+        monkeypatch.setattr(cache, name, counting(name, getattr(cache, name)))
+    assert cached_day_slots(3, DAY, lambda: []) == ['11:00']
+    assert calls == []
@@ -0,0 +1,42 @@
+from datetime import date, time
+
+import pytest
+
+from models.database import db, Doctor, DoctorAvailability, Appointment, Patient
+from models.slots import slot_status
+
+DAY = date(2030, 1, 7)
+
+@pytest.fixture
+def doctor_id(app):
+    doctor = Doctor(name='Doc', username='doc', department_id=1)
+    doctor.set_password('pw')
+    db.session.add(doctor)
+    db.session.flush()
+    db.session.add_all([
+        DoctorAvailability(doctor_id=doctor.id, date=DAY, start_time=time(9, 0), end_time=time(10, 0)),
+        DoctorAvailability(doctor_id=doctor.id, date=DAY, start_time=time(9, 15), end_time=time(10, 15)),
+    ])
+    db.session.commit()
+    return doctor.id
+
+@pytest.mark.parametrize('slot, expected', [
+    (time(9, 0), 'available'),
+    (time(9, 30), 'available'),
+    (time(9, 15), 'unavailable'),
+    (time(9, 45), 'unavailable'),
+    (time(10, 0), 'unavailable'),
+    (time(8, 30), 'unavailable'),
+])
+def test_overlapping_windows_only_accept_expanded_slots(doctor_id, slot, expected):
+    assert slot_status(doctor_id, DAY, slot) == expected
+
+def test_booked_slot(doctor_id):
+    patient = Patient(username='pat', full_name='Pat')
+    patient.set_password('pw')
+    db.session.add(patient)
+    db.session.flush()
+    db.session.add(Appointment(patient_id=patient.id, doctor_id=doctor_id, date=DAY, time=time(9, 30), status='booked'))
+    db.session.commit()
+    assert slot_status(doctor_id, DAY, time(9, 30)) == 'booked'
+    assert slot_status(doctor_id, DAY, time(9, 0)) == 'available'
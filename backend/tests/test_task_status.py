@@ -0,0 +1,14 @@
+from types import SimpleNamespace
+
+import tasks.exports
+
+def test_task_status_survives_progress_cache_outage(app, login, monkeypatch):
+    def unavailable(job_id):
+        raise ConnectionError('Redis is down')
+    monkeypatch.setattr(tasks.exports, 'export_progress', unavailable)
+    monkeypatch.setattr('celery.result.AsyncResult', lambda task_id, app=None: SimpleNamespace(state='PENDING', status='PENDING'))
+
+    client = login(app.test_client(), 'admin', 'admin')
+    response = client.get('/task-status/abc')
+    assert response.status_code == 200
+    assert response.json == {'task_id': 'abc', 'state': 'PENDING', 'status': 'PENDING', 'message': 'Task is pending'}
@@ -0,0 +1,95 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+from models.database import db, FailedWebhook
+from tasks import webhooks
+
+class StubServer:
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                stub.requests.append((time.monotonic(), json.loads(body)))
+                status, headers = stub.responses.pop(0) if stub.responses else (200, {})
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/hook'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def reply(self, *statuses, headers=None):
+        self.responses += [(status, headers or {}) for status in statuses]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(webhooks, 'time', SimpleNamespace(monotonic=time.monotonic, sleep=recorded.append))
+    monkeypatch.setattr(webhooks, 'rate_limiter', webhooks.HostRateLimiter(1000))
+    return recorded
+
+def test_retries_server_errors(stub, sleeps):
+    stub.reply(503, 503)
+    result = webhooks.deliver(stub.url, {'text': 'hi'})
+    assert result == {'ok': True, 'attempts': 3, 'error': None}
+    assert len(stub.requests) == 3
+
+def test_honours_retry_after_on_429(stub, sleeps):
+    stub.reply(429, headers={'Retry-After': '2'})
+    result = webhooks.deliver(stub.url, {'text': 'hi'})
+    assert result['ok'] and result['attempts'] == 2
+    assert 2.0 in sleeps
+
+@pytest.mark.parametrize('status', [400, 403, 404])
+def test_does_not_retry_client_errors(stub, sleeps, status):
+    stub.reply(status)
+    result = webhooks.deliver(stub.url, {'text': 'hi'})
+    assert result == {'ok': False, 'attempts': 1, 'error': f'HTTP {status}'}
+    assert len(stub.requests) == 1
+
+def test_rate_limits_each_host(stub, monkeypatch):
+    monkeypatch.setattr(webhooks, 'rate_limiter', webhooks.HostRateLimiter(webhooks.HOST_RATE_PER_SECOND))
+    messages = [(stub.url, {'n': n}) for n in range(webhooks.HOST_RATE_PER_SECOND + 1)]
+    assert all(result['ok'] for result in webhooks.deliver_many(messages))
+    arrivals = sorted(arrived for arrived, _ in stub.requests)
+    assert arrivals[-1] - arrivals[0] >= 0.9
+
+def test_records_failures_and_replays_them(app, stub, sleeps):
+    from tasks.celery_tasks import replay_failed_webhooks
+    stub.reply(*[500] * webhooks.MAX_ATTEMPTS)
+    assert webhooks.send_webhooks([(stub.url, {'text': 'reminder'})]) == 0
+    failed = FailedWebhook.query.one()
+    assert (failed.url, failed.payload, failed.attempts, failed.error) == (stub.url, {'text': 'reminder'}, webhooks.MAX_ATTEMPTS, 'HTTP 500')
+
+    assert replay_failed_webhooks.apply().result == 'Webhook replay: 1 delivered, 0 still failing'
+    db.session.expire_all()
+    failed = db.session.get(FailedWebhook, failed.id)
+    assert failed.delivered_at is not None
+    assert failed.replays == 1
+    assert failed.attempts == webhooks.MAX_ATTEMPTS + 1
+    assert stub.requests[-1][1] == {'text': 'reminder'}